@@ -1,123 +1,266 @@
-import time
-import psutil
+import argparse
+import json
 import os
-from main import PDFOutlineExtractor, PersonaDocumentAnalyzer
-
-class PerformanceBenchmark:
-    def __init__(self):
-        self.process = psutil.Process(os.getpid())
-    
-    def get_memory_usage(self):
-        """Get current memory usage in MB"""
-        return self.process.memory_info().rss / 1024 / 1024
-    
-    def benchmark_round_1a(self, pdf_path):
-        """Benchmark Round 1A performance"""
-        print(f"Benchmarking Round 1A with {pdf_path}")
-        
-        extractor = PDFOutlineExtractor()
-        
-        # Memory before
-        mem_before = self.get_memory_usage()
-        
-        # Time the extraction
-        start_time = time.time()
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+import fitz
+from main import PDFOutlineExtractor, PersonaDocumentAnalyzer, load_collection, select_top_k
+from section_store import SectionStore
+
+STAGES = ["open", "extract", "split", "score", "rank", "serialize"]
+# Timings are only comparable between runs that agree on all of these
+ENVIRONMENT_KEYS = ("python", "pymupdf", "machine", "host", "cpus")
+
+# Words for synthetic pages; a few overlap with the synthetic query so scoring has work to do
+SYNTHETIC_WORDS = ("trip plan travel group friends hotel restaurant beach city museum "
+                   "history culture cuisine wine market festival village coast train budget "
+                   "itinerary activity evening tour guide local season weather packing").split()
+SYNTHETIC_PERSONA = "Travel Planner"
+SYNTHETIC_JOB = "Plan a trip of 4 days for a group of 10 college friends."
+
+def create_synthetic_pdf(pdf_path, pages=50, seed=0):
+    """Write a PDF with numbered headings and body paragraphs on every page"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        y = 72
+        if page_num == 0:
+            page.insert_text((72, y), "Synthetic Benchmark Document", fontsize=24, fontname="hebo")
+            y += 48
+        page.insert_text((72, y), f"{page_num + 1}. Chapter {page_num + 1}", fontsize=16, fontname="hebo")
+        y += 32
+        for sub in range(3):
+            page.insert_text((72, y), f"{page_num + 1}.{sub + 1} Topic {sub + 1}", fontsize=13, fontname="hebo")
+            y += 22
+            body = " ".join(rng.choice(SYNTHETIC_WORDS) for _ in range(70)).capitalize() + "."
+            page.insert_textbox(fitz.Rect(72, y, 540, y + 80), body, fontsize=10)
+            y += 90
+    doc.save(pdf_path)
+    doc.close()
+
+def run_pipeline(analyzer, pdf_paths, persona, job):
+    """One Round 1B run with each stage timed separately; returns (timings, pages, result JSON)"""
+    timings = defaultdict(float)
+    sections = SectionStore()
+    pages = 0
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        doc = fitz.open(pdf_path)
+        timings["open"] += time.perf_counter() - start
+
+        document = os.path.basename(pdf_path)
+        for page_num in range(len(doc)):
+            start = time.perf_counter()
+            text, spans = analyzer.read_page(doc[page_num])
+            middle = time.perf_counter()
+            sections.add_text(document, page_num + 1, text, spans)
+            end = time.perf_counter()
+            timings["extract"] += middle - start
+            timings["split"] += end - middle
+        pages += len(doc)
+        doc.close()
+
+    start = time.perf_counter()
+    query = analyzer.compile_query(persona, job)
+    scored = [(query.score(section), section) for section in sections]
+    timings["score"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    top_sections = select_top_k(scored, analyzer.top_k)
+    result = analyzer.build_result(pdf_paths, persona, job, top_sections)
+    timings["rank"] += time.perf_counter() - start
+
+    start = time.perf_counter()
+    serialized = json.dumps(result, indent=2, ensure_ascii=False)
+    timings["serialize"] += time.perf_counter() - start
+    return timings, pages, serialized
+
+def benchmark_corpus(name, pdf_paths, persona, job, repeat):
+    """Median per-stage timings over repeated runs, plus tracemalloc peak and throughput"""
+    analyzer = PersonaDocumentAnalyzer()
+    runs = defaultdict(list)
+    pages = 0
+    for _ in range(repeat):
+        timings, pages, _ = run_pipeline(analyzer, pdf_paths, persona, job)
+        for stage in STAGES:
+            runs[stage].append(timings[stage])
+        runs["total"].append(sum(timings[stage] for stage in STAGES))
+
+    # End to end through the public API, which streams instead of staging
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyzer.analyze_documents(pdf_paths, persona, job)
+        runs["analyze_documents"].append(time.perf_counter() - start)
+
+    # Separate run: tracemalloc slows Python allocations and does not see
+    # MuPDF's own C allocations, so it only measures the Python side
+    tracemalloc.start()
+    run_pipeline(analyzer, pdf_paths, persona, job)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = {stage: statistics.median(values) for stage, values in runs.items()}
+    return {
+        "documents": len(pdf_paths),
+        "pages": pages,
+        "repeat": repeat,
+        "seconds": {stage: round(value, 6) for stage, value in seconds.items()},
+        "seconds_min": {stage: round(min(values), 6) for stage, values in runs.items()},
+        "peak_python_mb": round(peak / 1024 / 1024, 3),
+        "pages_per_second": round(pages / seconds["total"], 1) if seconds["total"] else None
+    }
+
+def benchmark_outline(pdf_path, repeat):
+    """Round 1A outline extraction on a single PDF"""
+    extractor = PDFOutlineExtractor()
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
         result = extractor.extract_outline(pdf_path)
-        end_time = time.time()
-        
-        # Memory after
-        mem_after = self.get_memory_usage()
-        
-        processing_time = end_time - start_time
-        memory_used = mem_after - mem_before
-        
-        print(f"📊 Round 1A Benchmark Results:")
-        print(f"   ⏱️  Processing Time: {processing_time:.2f} seconds")
-        print(f"   🧠 Memory Usage: {memory_used:.2f} MB")
-        print(f"   📄 Headings Found: {len(result['outline'])}")
-        print(f"   📋 Document Title: {result['title']}")
-        
-        # Check constraints
-        if processing_time <= 10:
-            print("   ✅ Time constraint satisfied (≤10s)")
-        else:
-            print("   ❌ Time constraint violated (>10s)")
-        
-        return {
-            "processing_time": processing_time,
-            "memory_used": memory_used,
-            "headings_count": len(result['outline']),
-            "title": result['title']
-        }
-    
-    def benchmark_round_1b(self, pdf_paths, persona, job):
-        """Benchmark Round 1B performance"""
-        print(f"Benchmarking Round 1B with {len(pdf_paths)} documents")
-        
-        analyzer = PersonaDocumentAnalyzer()
-        
-        # Memory before
-        mem_before = self.get_memory_usage()
-        
-        # Time the analysis
-        start_time = time.time()
-        result = analyzer.analyze_documents(pdf_paths, persona, job)
-        end_time = time.time()
-        
-        # Memory after
-        mem_after = self.get_memory_usage()
-        
-        processing_time = end_time - start_time
-        memory_used = mem_after - mem_before
-        
-        print(f"📊 Round 1B Benchmark Results:")
-        print(f"   ⏱️  Processing Time: {processing_time:.2f} seconds")
-        print(f"   🧠 Memory Usage: {memory_used:.2f} MB")
-        print(f"   📑 Documents Processed: {len(result['metadata']['input_documents'])}")
-        print(f"   🎯 Sections Extracted: {len(result['extracted_sections'])}")
-        print(f"   🔍 Subsections: {len(result['subsection_analysis'])}")
-        
-        # Check constraints
-        if processing_time <= 60:
-            print("   ✅ Time constraint satisfied (≤60s)")
-        else:
-            print("   ❌ Time constraint violated (>60s)")
-        
-        return {
-            "processing_time": processing_time,
-            "memory_used": memory_used,
-            "sections_count": len(result['extracted_sections']),
-            "subsections_count": len(result['subsection_analysis'])
-        }
-
-def run_benchmarks():
-    """Run performance benchmarks"""
-    benchmark = PerformanceBenchmark()
-    
+        times.append(time.perf_counter() - start)
+    with fitz.open(pdf_path) as doc:
+        pages = len(doc)
+    median = statistics.median(times)
+    return {
+        "pages": pages,
+        "headings": len(result["outline"]),
+        "seconds": {"total": round(median, 6)},
+        "seconds_min": {"total": round(min(times), 6)},
+        "pages_per_second": round(pages / median, 1) if median else None
+    }
+
+def bundled_corpora(input_dir):
+    """(name, pdf paths, persona, job) for each bundled collection"""
+    corpora = []
+    for folder in sorted(Path(input_dir).iterdir()):
+        if folder.is_dir():
+            collection = load_collection(folder, Path(tempfile.gettempdir()))
+            if collection is not None:
+                corpora.append((collection.name, [str(pdf) for pdf in collection.pdf_paths],
+                                collection.persona, collection.job))
+    return corpora
+
+def environment():
+    """Interpreter, library and host a benchmark ran on"""
+    return {
+        "python": sys.version.split()[0],
+        "pymupdf": fitz.VersionBind,
+        "machine": platform.machine(),
+        "host": platform.node(),
+        "cpus": os.cpu_count()
+    }
+
+def environment_mismatches(results, baseline):
+    """Environment fields in which the baseline differs from these results, as printable strings"""
+    return [f"{key}: {results.get(key)} vs baseline {baseline.get(key)}"
+            for key in ENVIRONMENT_KEYS if results.get(key) != baseline.get(key)]
+
+def compare(results, baseline, tolerance, min_seconds):
+    """Regressions of results against baseline, as printable strings"""
+    regressions = []
+    for name, current in results["corpora"].items():
+        previous = baseline.get("corpora", {}).get(name)
+        if previous is None:
+            continue
+        for stage, seconds in current["seconds"].items():
+            before = previous["seconds"].get(stage)
+            # Tiny stages are dominated by timer noise, so also require an absolute slowdown
+            if before is not None and seconds > before * tolerance and seconds - before > min_seconds:
+                regressions.append(f"{name}/{stage}: {seconds * 1000:.1f} ms vs baseline {before * 1000:.1f} ms")
+        before = previous.get("peak_python_mb")
+        if before and current.get("peak_python_mb", 0) > before * tolerance:
+            regressions.append(f"{name}/peak memory: {current['peak_python_mb']} MB vs baseline {before} MB")
+    return regressions
+
+def print_results(results):
+    for name, corpus in results["corpora"].items():
+        print(f"📊 {name}: {corpus['pages']} pages, {corpus['pages_per_second']} pages/s")
+        print("   " + "  ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in corpus["seconds"].items()))
+        if "peak_python_mb" in corpus:
+            print(f"   🧠 Peak Python memory: {corpus['peak_python_mb']} MB")
+
+def run_benchmarks(argv=None):
+    """Run the benchmark suite, comparing against a baseline from the same environment when one is given"""
+    parser = argparse.ArgumentParser(description="Per-stage benchmarks over the bundled and synthetic corpora")
+    parser.add_argument("--input-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "input"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic-docs", type=int, default=10)
+    parser.add_argument("--synthetic-pages", type=int, default=50)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None,
+                        help="earlier results of this machine to compare with; compared only when recorded "
+                             "on the same host, CPU count, Python and PyMuPDF")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the --baseline file")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="fail when a median exceeds baseline by this factor")
+    parser.add_argument("--min-seconds", type=float, default=0.005,
+                        help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+    if args.save_baseline and not args.baseline:
+        parser.error("--save-baseline needs --baseline PATH")
+
     print("🚀 Starting Performance Benchmarks\n")
-    
-    # Test files (you would replace these with actual test files)
-    test_pdf_1a = "sample.pdf"
-    test_pdfs_1b = ["doc1.pdf", "doc2.pdf", "doc3.pdf"]
-    test_persona = "PhD Researcher in Computational Biology"
-    test_job = "Prepare comprehensive literature review focusing on methodologies"
-    
-    # Benchmark Round 1A
-    if os.path.exists(test_pdf_1a):
-        print("=" * 50)
-        benchmark.benchmark_round_1a(test_pdf_1a)
-    else:
-        print(f"⚠️  Test file {test_pdf_1a} not found, skipping Round 1A benchmark")
-    
-    # Benchmark Round 1B
-    existing_pdfs = [pdf for pdf in test_pdfs_1b if os.path.exists(pdf)]
-    if existing_pdfs:
-        print("\n" + "=" * 50)
-        benchmark.benchmark_round_1b(existing_pdfs, test_persona, test_job)
-    else:
-        print("⚠️  No test files found for Round 1B, skipping benchmark")
-    
-    print("\n🏁 Benchmarking Complete")
+    results = {**environment(), "corpora": {}}
+
+    for name, pdf_paths, persona, job in bundled_corpora(args.input_dir):
+        results["corpora"][name] = benchmark_corpus(name, pdf_paths, persona, job, args.repeat)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        synthetic = []
+        for i in range(args.synthetic_docs):
+            pdf_path = os.path.join(temp_dir, f"synthetic_{i}.pdf")
+            create_synthetic_pdf(pdf_path, pages=args.synthetic_pages, seed=i)
+            synthetic.append(pdf_path)
+        if synthetic:
+            name = f"synthetic {args.synthetic_docs}x{args.synthetic_pages}"
+            results["corpora"][name] = benchmark_corpus(name, synthetic, SYNTHETIC_PERSONA, SYNTHETIC_JOB, args.repeat)
+            # README target for Round 1A: under 5 seconds for a 50-page PDF
+            results["corpora"]["outline 1A"] = benchmark_outline(synthetic[0], args.repeat)
+
+    print_results(results)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if args.baseline is None:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"⚠️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    mismatches = environment_mismatches(results, baseline)
+    if mismatches:
+        # Absolute timings from another machine or library version say nothing about this change
+        print(f"\n⚠️  Baseline {args.baseline} was recorded in another environment; not compared:")
+        for mismatch in mismatches:
+            print(f"   {mismatch}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.tolerance}x baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"\n✅ No regressions over {args.tolerance}x baseline")
+    return 0
 
 if __name__ == "__main__":
-    run_benchmarks()
\ No newline at end of file
+    sys.exit(run_benchmarks())
@@ -0,0 +1,95 @@
+# Adobe India Hackathon - Connecting the Dots
+# Near-duplicate section detection with MinHash and LSH banding
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from scoring import tokenize
+from section_store import SectionStore
+
+NUM_PERM = 64
+SHINGLE_SIZE = 3
+SIGNATURE_BATCH = 512
+# Estimated Jaccard similarity at which sections count as near-duplicates
+DEFAULT_SIMILARITY = 0.5
+_PRIME = (1 << 31) - 1
+# Multiply-shift hash functions: the high 32 bits of a * x + b (mod 2^64), a odd
+_rng = np.random.default_rng(1)
+_A = (_rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64)
+_EMPTY = np.iinfo(np.uint32).max
+
+def shingle_hashes(text: str, vocabulary: Dict[str, int]) -> np.ndarray:
+    """Hashes of the overlapping word 3-grams of text (the words themselves for shorter text)
+
+    Tokens are numbered through vocabulary, which is shared by every text
+    compared, so equal shingles hash equally without hashing strings.
+    """
+    tokens = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(text)],
+                      dtype=np.uint64)
+    if len(tokens) < SHINGLE_SIZE:
+        return np.unique(tokens % _PRIME)
+    # Polynomial combination of each window's token hashes
+    combined = np.zeros(len(tokens) - SHINGLE_SIZE + 1, dtype=np.uint64)
+    for offset in range(SHINGLE_SIZE):
+        combined = (combined * np.uint64(1000003) + tokens[offset:offset + len(combined)]) % np.uint64(_PRIME)
+    return np.unique(combined)
+
+def minhash_signatures(texts: List[str], vocabulary: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """MinHash signatures of the shingle sets of texts, one row per text"""
+    signatures = np.full((len(texts), NUM_PERM), _EMPTY, dtype=np.uint32)
+    vocabulary = {} if vocabulary is None else vocabulary
+    shingle_sets = [shingle_hashes(text, vocabulary) for text in texts]
+    rows = np.array([i for i, shingles in enumerate(shingle_sets) if len(shingles)], dtype=np.int64)
+    if not len(rows):
+        return signatures
+    # Hash every shingle of every text at once, then take each text's minimum
+    shingles = np.concatenate([shingle_sets[i] for i in rows])
+    starts = np.concatenate([[0], np.cumsum([len(shingle_sets[i]) for i in rows])[:-1]])
+    # Unsigned overflow is the intended mod 2^64 wraparound
+    hashed = ((_A * shingles + _B) >> np.uint64(32)).astype(np.uint32)
+    signatures[rows] = np.minimum.reduceat(hashed, starts, axis=1).T
+    return signatures
+
+def band_rows(threshold: float) -> int:
+    """Rows per LSH band whose S-curve midpoint, (1/bands)^(1/rows), is closest to threshold"""
+    options = [rows for rows in (1, 2, 4, 8, 16, 32) if NUM_PERM % rows == 0]
+    return min(options, key=lambda rows: abs((rows / NUM_PERM) ** (1 / rows) - threshold))
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+def duplicate_representatives(store: SectionStore, threshold: float = DEFAULT_SIMILARITY) -> np.ndarray:
+    """For every section, the index of the first section of its near-duplicate cluster
+
+    Sections are bucketed by bands of their MinHash signatures, so only
+    sections sharing a band are compared, in roughly linear time overall. A
+    candidate joins a cluster when its estimated Jaccard similarity with the
+    section already in the bucket reaches threshold.
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError(f"Similarity threshold must be in (0, 1], got {threshold}")
+    n = len(store)
+    signatures = np.empty((n, NUM_PERM), dtype=np.uint32)
+    vocabulary = {}
+    # Batches bound the memory of the hashed shingle matrix
+    for start in range(0, n, SIGNATURE_BATCH):
+        texts = [store.title(i) + "\n" + store.content(i) for i in range(start, min(n, start + SIGNATURE_BATCH))]
+        signatures[start:start + len(texts)] = minhash_signatures(texts, vocabulary)
+
+    rows = band_rows(threshold)
+    parent = list(range(n))
+    for start in range(0, NUM_PERM, rows):
+        buckets: Dict[bytes, int] = {}
+        band = np.ascontiguousarray(signatures[:, start:start + rows])
+        for i in range(n):
+            first = buckets.setdefault(band[i].tobytes(), i)
+            if first != i and np.mean(signatures[first] == signatures[i]) >= threshold:
+                a, b = _find(parent, first), _find(parent, i)
+                # The earlier section represents the cluster
+                parent[max(a, b)] = min(a, b)
+    return np.array([_find(parent, i) for i in range(n)], dtype=np.int64)
@@ -2,4 +2,4 @@
 set -e
 
 echo "Running Round 1B: Persona Driven"
-python main.py
+python main.py "$@"
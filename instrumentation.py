@@ -0,0 +1,128 @@
+# Adobe India Hackathon - Connecting the Dots
+# Opt-in spans, counters and profiling for the analysis pipeline
+
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict
+
+_NULL_SPAN = nullcontext()
+
+class Tracer:
+    """Records timed spans, stage totals and counters for one analysis
+
+    A disabled tracer turns every call into a no-op, so instrumented code pays
+    almost nothing when tracing is off. The trace is written in Chrome trace
+    event format (load it in chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, enabled: bool = True, profile: bool = False):
+        self.enabled = enabled
+        self.events = []
+        self.counters = Counter()
+        # Seconds per stage for work too fine-grained to record as spans
+        self.stage_seconds = defaultdict(float)
+        self._origin = time.perf_counter()
+        self._profiler = cProfile.Profile() if enabled and profile else None
+
+    def __getstate__(self):
+        # Worker processes get an empty copy on the same clock; what they
+        # record comes back through export() and merge()
+        return {"enabled": self.enabled, "origin": self._origin}
+
+    def __setstate__(self, state):
+        self.__init__(enabled=state["enabled"])
+        self._origin = state["origin"]
+
+    def span(self, name: str, **args):
+        """Context manager timing a named span"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name: str, args: Dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args
+            })
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def add_time(self, stage: str, seconds: float):
+        if self.enabled:
+            self.stage_seconds[stage] += seconds
+
+    def export(self) -> Dict:
+        """Everything recorded so far, to be merged into another process's tracer"""
+        return {"events": self.events, "counters": dict(self.counters),
+                "stage_seconds": dict(self.stage_seconds)}
+
+    def merge(self, recorded: Dict):
+        """Add spans, counters and stage totals exported by a worker's tracer"""
+        if not self.enabled:
+            return
+        self.events.extend(recorded["events"])
+        self.counters.update(recorded["counters"])
+        for stage, seconds in recorded["stage_seconds"].items():
+            self.stage_seconds[stage] += seconds
+
+    @contextmanager
+    def profile(self):
+        """Run the enclosed block under cProfile when profiling was requested"""
+        if self._profiler is None:
+            yield
+            return
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+
+    def to_chrome_trace(self) -> Dict:
+        end = round((time.perf_counter() - self._origin) * 1e6, 1)
+        stage_seconds = defaultdict(float, self.stage_seconds)
+        for event in self.events:
+            stage_seconds[event["name"]] += event["dur"] / 1e6
+        counter_events = [{
+            "name": "counters",
+            "ph": "C",
+            "ts": end,
+            "pid": os.getpid(),
+            "args": dict(self.counters)
+        }]
+        return {
+            "traceEvents": self.events + counter_events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "counters": dict(self.counters),
+                "stage_seconds": {stage: round(seconds, 6) for stage, seconds in stage_seconds.items()}
+            }
+        }
+
+    def write(self, trace_path: str):
+        """Write the Chrome trace, plus a .prof file beside it when profiling"""
+        if not self.enabled:
+            return
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        if self._profiler is not None:
+            self._profiler.dump_stats(os.path.splitext(trace_path)[0] + ".prof")
+
+NULL_TRACER = Tracer(enabled=False)
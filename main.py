@@ -6,17 +6,60 @@ import json
 import re
 import time
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional, Iterable, Iterator, Set
 import fitz  # PyMuPDF
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 import argparse
+import hashlib
+import heapq
+import math
+from collections import Counter
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+from scoring import CompiledQuery, TermMatrix, bm25_scores, keyword_scores, section_terms
+from dedup import DEFAULT_SIMILARITY, duplicate_representatives
+from instrumentation import NULL_TRACER, Tracer
+from manifest import CollectionManifest
+from refinement import refine_texts
+from page_stream import MemoryGuard, iter_streamed_pages, open_streamed
+from section_cache import SectionCache
+from section_store import Section, SectionStore, block_section_spans, page_section_spans
+from shared_corpus import SharedScorer
+from term_stats import TermStatistics
+from vector_index import DEFAULT_DIM, VectorIndex
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever extract_document_sections output changes, so cached
+# sections from an older extractor are not reused
+EXTRACTOR_VERSION = "1"
+
+# "paragraphs" splits get_text() output at blank lines; "blocks" cuts
+# sections at headings and text blocks of one TextPage per page, which
+# costs about 40% more extraction time
+SEGMENTATIONS = ("paragraphs", "blocks")
+
+def extractor_version(segmentation: str = "paragraphs") -> str:
+    """Version of the extracted sections for a segmentation, for cache keys and fingerprints"""
+    return EXTRACTOR_VERSION if segmentation == "paragraphs" else f"{EXTRACTOR_VERSION}-{segmentation}"
+
+# "heuristic" is the additive keyword score; "bm25" ranks the whole
+# collection at once over a sparse section-by-term matrix; "vector" is
+# cosine similarity against a persisted hashed TF-IDF index
+RANKERS = ("heuristic", "bm25", "vector")
+
+# Share of an analysis deadline held back for assembling the result
+DEADLINE_RESERVE = 0.05
+# Pages read in order at the start of each document before its pace is
+# trusted; the first pages load fonts and images that later pages reuse
+DEADLINE_PACE_PAGES = 3
+
 @dataclass
 class HeadingInfo:
     level: str
@@ -26,24 +69,249 @@ class HeadingInfo:
     font_flags: int = 0
     bbox: Tuple[float, float, float, float] = None
 
-@dataclass
-class Section:
-    document: str
-    page_number: int
-    section_title: str
-    importance_rank: int
-    content: str = ""
-
 @dataclass
 class SubSection:
     document: str
     refined_text: str
     page_number: int
 
+class PDFOutlineExtractor:
+    """Round 1A: Title and H1-H3 outline extraction"""
+    
+    def __init__(self):
+        # "1.", "2.3", "4.1.2" style numbering; the depth gives the level
+        self.numbered_pattern = re.compile(r"^(\d+(?:\.\d+){0,2})\.?\s+\S")
+        self.chapter_pattern = re.compile(r"^(chapter|part|appendix)\b", re.IGNORECASE)
+        self.max_heading_length = 120
+        # Minimum font size ratio over body text for a line to count as a heading
+        self.size_ratio = 1.15
+    
+    def extract_outline(self, pdf_path: str) -> Dict:
+        """Extract the document title and heading outline in one pass over the pages"""
+        size_counts = Counter()
+        candidates = []
+        
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(len(doc)):
+                page_dict = doc[page_num].get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+                # Font statistics and heading candidates are collected in the same walk
+                self._scan_page(page_dict, page_num + 1, size_counts, candidates)
+            metadata_title = (doc.metadata or {}).get("title", "") or ""
+        
+        if not size_counts:
+            return {"title": metadata_title.strip(), "outline": []}
+        
+        body_size = size_counts.most_common(1)[0][0]
+        headings = [c for c in candidates if self._is_heading(c, body_size)]
+        
+        title, headings = self._split_title(headings, body_size, metadata_title)
+        self._assign_levels(headings)
+        
+        return {
+            "title": title,
+            "outline": [
+                {"level": heading.level, "text": heading.text, "page": heading.page}
+                for heading in headings
+            ]
+        }
+    
+    def _scan_page(self, page_dict: Dict, page: int, size_counts: Counter, candidates: List[HeadingInfo]):
+        for block in page_dict["blocks"]:
+            if block.get("type", 0) != 0:
+                continue
+            
+            lines = []
+            for line in block["lines"]:
+                spans = [span for span in line["spans"] if span["text"].strip()]
+                if spans:
+                    bold = all(span["flags"] & fitz.TEXT_FONT_BOLD or "bold" in span["font"].lower()
+                               for span in spans)
+                    lines.append((line, spans, bold))
+            
+            # A bold line stands out as a heading unless the whole block is bold
+            block_bold = len(lines) > 2 and all(bold for _, _, bold in lines)
+            block_right = block["bbox"][2]
+            
+            previous = None
+            for line, spans, bold in lines:
+                text = " ".join(span["text"].strip() for span in spans)
+                size = round(max(span["size"] for span in spans), 1)
+                for span in spans:
+                    size_counts[round(span["size"], 1)] += len(span["text"])
+                
+                if len(text) > self.max_heading_length:
+                    previous = None
+                    continue
+                
+                flags = fitz.TEXT_FONT_BOLD if bold else 0
+                
+                # A heading wrapped onto the next line runs to the block's right edge
+                if (previous is not None and previous.font_size == size
+                        and previous.font_flags == flags
+                        and previous.bbox[2] >= block_right - 2
+                        and len(previous.text) + len(text) < self.max_heading_length):
+                    previous.text = f"{previous.text} {text}"
+                    x0, y0, _, _ = previous.bbox
+                    previous.bbox = (x0, y0, line["bbox"][2], line["bbox"][3])
+                    continue
+                
+                # The level field is filled in later; until then it marks lines
+                # that are set apart from the surrounding block
+                standalone = len(lines) <= 2 or (bold and not block_bold)
+                previous = HeadingInfo("standalone" if standalone else "", text, page,
+                                       size, flags, tuple(line["bbox"]))
+                candidates.append(previous)
+    
+    def _is_heading(self, candidate: HeadingInfo, body_size: float) -> bool:
+        text = candidate.text
+        if sum(ch.isalpha() for ch in text) < 3:
+            return False
+        if candidate.font_size >= body_size * self.size_ratio:
+            return True
+        if candidate.font_size < body_size * 0.95 or text.endswith((".", ",", ";")):
+            return False
+        
+        bold = bool(candidate.font_flags & fitz.TEXT_FONT_BOLD)
+        return bold and candidate.level == "standalone"
+    
+    def _split_title(self, headings: List[HeadingInfo], body_size: float,
+                     metadata_title: str) -> Tuple[str, List[HeadingInfo]]:
+        """Take the largest text on the first page as the title"""
+        first_page = [h for h in headings if h.page == 1]
+        if not first_page:
+            return metadata_title.strip(), headings
+        
+        largest = max(h.font_size for h in first_page)
+        if largest >= body_size * self.size_ratio:
+            title_parts = [h for h in first_page if h.font_size == largest]
+        else:
+            # No size contrast; the first heading on the page is the best guess
+            title_parts = [first_page[0]]
+        
+        title = " ".join(h.text for h in title_parts)
+        return title, [h for h in headings if h not in title_parts]
+    
+    def _assign_levels(self, headings: List[HeadingInfo]):
+        """Map headings to H1-H3 by numbering depth, falling back to font size rank"""
+        sizes = sorted({h.font_size for h in headings}, reverse=True)
+        size_rank = {size: min(rank, 2) for rank, size in enumerate(sizes)}
+        
+        for heading in headings:
+            match = self.numbered_pattern.match(heading.text)
+            if match:
+                depth = match.group(1).count(".")
+            elif self.chapter_pattern.match(heading.text):
+                depth = 0
+            else:
+                depth = size_rank[heading.font_size]
+            heading.level = f"H{depth + 1}"
+
+def collection_key(document_paths: List[str]) -> str:
+    """Short stable name for a collection's files, from the folders holding its PDFs
+
+    Adding or removing a PDF keeps the name, so saved state is updated rather
+    than rebuilt under a new one.
+    """
+    folders = sorted({os.path.dirname(os.path.abspath(path)) for path in document_paths})
+    return hashlib.sha1("\0".join(folders).encode("utf-8")).hexdigest()[:16]
+
+def select_top_k(scored: Iterable[Tuple[float, Any]], k: int) -> List[Any]:
+    """Keep the k best (score, section) pairs from a stream, best first
+
+    Equal scores keep their stream order, matching a stable descending sort,
+    while only k sections are ever held in memory.
+    """
+    heap = []
+    for seq, (score, section) in enumerate(scored):
+        # The negated sequence number ranks earlier sections higher on ties
+        # and keeps the sections themselves out of comparisons
+        entry = (score, -seq, section)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    
+    heap.sort(reverse=True)
+    return [section for _, _, section in heap]
+
 class PersonaDocumentAnalyzer:
     """Round 1B: Persona-driven document intelligence"""
     
-    def __init__(self):
+    def __init__(self, workers: int = 1, cache: Optional[SectionCache] = None,
+                 legacy_scoring: bool = False, ranker: str = "heuristic", top_k: int = 10,
+                 two_phase: float = 0.0, tracer: Optional[Tracer] = None,
+                 low_memory: bool = False, max_rss_mb: float = 500.0,
+                 index_dir: Optional[str] = None, index_dim: int = DEFAULT_DIM, index_partition: bool = False,
+                 dedup: float = 0.0, refine: bool = False, deadline: Optional[float] = None,
+                 term_weighting: bool = False, stats_dir: Optional[str] = None, score_workers: int = 1,
+                 segmentation: str = "paragraphs"):
+        # Number of processes used to extract PDFs; 0 means one per CPU
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache
+        # Reproduce the original substring-scan scores, for regression checks
+        self.legacy_scoring = legacy_scoring
+        if ranker not in RANKERS:
+            raise ValueError(f"Unknown ranker '{ranker}', expected one of {', '.join(RANKERS)}")
+        self.ranker = ranker
+        if segmentation not in SEGMENTATIONS:
+            raise ValueError(f"Unknown segmentation '{segmentation}', expected one of {', '.join(SEGMENTATIONS)}")
+        self.segmentation = segmentation
+        # Low-memory mode streams PDFs from disk page by page in this
+        # process under an RSS ceiling, keeping only the top sections
+        self.low_memory = low_memory
+        self.max_rss_mb = max_rss_mb
+        if low_memory:
+            if ranker != "heuristic":
+                raise ValueError(f"The {ranker} ranker needs the whole collection in memory; "
+                                 "use the heuristic ranker in low-memory mode")
+            if dedup:
+                raise ValueError("Near-duplicate collapsing needs the whole collection in memory")
+            # Worker results and cache entries hold whole documents
+            self.workers = 1
+            self.cache = None
+        # Where vector indexes are persisted, one subdirectory per collection;
+        # None builds them in memory for each analysis
+        self.index_dir = index_dir
+        self.index_dim = index_dim
+        # Partition large indexes by k-means for faster, approximate search;
+        # by default every section is scored
+        self.index_partition = index_partition
+        # Estimated Jaccard similarity at which sections count as near-duplicates
+        # and only the first of them is ranked; 0 disables collapsing
+        if not 0 <= dedup <= 1:
+            raise ValueError(f"Near-duplicate similarity must be in (0, 1], or 0 to disable; got {dedup}")
+        self.dedup = dedup
+        # Build subsection_analysis from the most query-relevant sentences
+        # instead of each section's first lines
+        self.refine = refine
+        # Seconds an analysis may take; pages are then read most promising
+        # document first and sampled once time runs short, and the best
+        # sections found by the deadline are returned. None reads everything.
+        self.deadline = deadline
+        if deadline is not None and (ranker != "heuristic" or dedup or two_phase):
+            raise ValueError("A deadline needs the streaming heuristic ranker, without dedup or two-phase retrieval")
+        # Scale keyword weights by how rare each term is in the collection,
+        # from term statistics kept per collection in stats_dir (None keeps
+        # them in memory for one analysis only)
+        self.term_weighting = term_weighting
+        self.stats_dir = stats_dir
+        if term_weighting and (ranker != "heuristic" or legacy_scoring or deadline is not None):
+            raise ValueError("Term weighting applies to the heuristic ranker, without legacy scoring or a deadline")
+        # Processes that score a stored collection in parallel, attached to one
+        # shared-memory copy of it; 1 scores in this process
+        self.score_workers = score_workers
+        if score_workers > 1 and (low_memory or deadline is not None):
+            raise ValueError("Parallel scoring needs the whole collection stored, "
+                             "which low-memory mode and a deadline avoid")
+        # Number of sections reported in extracted_sections
+        self.top_k = top_k
+        # Fraction of pages that survive the cheap first pass and get fully
+        # extracted; 0 disables two-phase retrieval
+        self.two_phase = two_phase
+        # Spans and counters are only recorded when a tracer is enabled
+        self.tracer = tracer or NULL_TRACER
+        # PDF bytes already read into memory, by path; such PDFs are not read from disk again
+        self.sources: Dict[str, bytes] = {}
         self.section_keywords = {
             "methodology": ["method", "approach", "technique", "procedure", "algorithm"],
             "results": ["result", "finding", "outcome", "performance", "evaluation"],
@@ -53,106 +321,574 @@ class PersonaDocumentAnalyzer:
             "data": ["data", "dataset", "statistics", "metrics", "numbers"]
         }
     
-    def extract_document_sections(self, pdf_path: str) -> List[Dict]:
-        """Extract sections from a single PDF"""
-        doc = fitz.open(pdf_path)
-        sections = []
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
+    def open_pdf(self, pdf_path: str) -> fitz.Document:
+        """Open a PDF from its preloaded bytes if there are any, otherwise from disk
+
+        The returned document is a context manager that closes it.
+        """
+        data = self.sources.get(pdf_path)
+        if data is not None:
+            return fitz.open(stream=data, filetype="pdf")
+        return (open_streamed if self.low_memory else fitz.open)(pdf_path)
+    
+    def _cache_key(self, pdf_path: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.key_for(pdf_path, self.sources.get(pdf_path))
+    
+    @property
+    def extractor_version(self) -> str:
+        return extractor_version(self.segmentation)
+    
+    def read_page(self, page: fitz.Page) -> Tuple[str, List[Tuple[int, int, int]]]:
+        """A page's text and its candidate sections as (start, title end, end) offsets
+
+        Block segmentation builds one TextPage and reads blocks, lines, text
+        and font sizes from a single dict extraction of it.
+        """
+        if self.segmentation == "paragraphs":
             text = page.get_text()
-            
-            # Split by potential section breaks
-            paragraphs = text.split('\n\n')
-            
-            for i, paragraph in enumerate(paragraphs):
-                paragraph = paragraph.strip()
-                if len(paragraph) > 50:  # Meaningful content
-                    # Try to identify section title
-                    lines = paragraph.split('\n')
-                    potential_title = lines[0].strip()
-                    
-                    if len(potential_title) < 100 and len(lines) > 1:
-                        sections.append({
-                            "document": os.path.basename(pdf_path),
-                            "page_number": page_num + 1,
-                            "section_title": potential_title,
-                            "content": paragraph,
-                            "importance_rank": 0  # Will be calculated later
-                        })
-        
-        doc.close()
+            return text, list(page_section_spans(text))
+        # The same flags as get_text(), so the characters extracted do not change
+        textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        return block_section_spans(textpage.extractDICT())
+    
+    def iter_pages(self, pdf_path: str, pages: Optional[Set[int]] = None) -> Iterator[Tuple[int, str, List[Tuple[int, int, int]]]]:
+        """Yield (page number, text, section spans) for each page of a PDF
+
+        When pages is given, only those (1-based) page numbers are extracted.
+        """
+        document = os.path.basename(pdf_path)
+        tracer = self.tracer
+        if self.low_memory:
+            guard = MemoryGuard(self.max_rss_mb)
+            for page_number, (text, spans) in iter_streamed_pages(pdf_path, guard, pages, self.read_page):
+                tracer.count("pages")
+                yield page_number, text, spans
+            return
+        
+        with tracer.span("open", document=document):
+            doc = self.open_pdf(pdf_path)
+        with doc:
+            for page_num in range(len(doc)):
+                if pages is not None and page_num + 1 not in pages:
+                    continue
+                with tracer.span("get_text", document=document, page=page_num + 1):
+                    text, spans = self.read_page(doc[page_num])
+                tracer.count("pages")
+                yield page_num + 1, text, spans
+    
+    def iter_document_sections(self, pdf_path: str, pages: Optional[Set[int]] = None) -> Iterator[Section]:
+        """Yield sections from a single PDF, one page at a time"""
+        document = os.path.basename(pdf_path)
+        for page_number, text, spans in self.iter_pages(pdf_path, pages):
+            if self.tracer.enabled:
+                # Materialize the page so splitting is timed apart from scoring
+                with self.tracer.span("split", document=document, page=page_number):
+                    page_sections = list(self.split_page_sections(text, spans, document, page_number))
+                yield from page_sections
+            else:
+                yield from self.split_page_sections(text, spans, document, page_number)
+    
+    def split_page_sections(self, text: str, spans: List[Tuple[int, int, int]], document: str,
+                            page_number: int) -> Iterator[Section]:
+        """Materialize one page's candidate sections"""
+        self.tracer.count("paragraphs", text.count('\n\n') + 1)
+        for start, title_end, end in spans:
+            self.tracer.count("candidates")
+            yield Section(
+                document=document,
+                page_number=page_number,
+                section_title=text[start:title_end],
+                importance_rank=0,  # Assigned when ranking
+                content=text[start:end]
+            )
+    
+    def extract_document_sections(self, pdf_path: str, pages: Optional[Set[int]] = None) -> SectionStore:
+        """Extract sections from a single PDF into a compact store"""
+        document = os.path.basename(pdf_path)
+        store = SectionStore()
+        for page_number, text, spans in self.iter_pages(pdf_path, pages):
+            with self.tracer.span("split", document=document, page=page_number):
+                self.tracer.count("paragraphs", text.count('\n\n') + 1)
+                self.tracer.count("candidates", store.add_text(document, page_number, text, spans))
+        return store
+    
+    def iter_document_stores(self, document_paths: List[str]) -> Iterator[SectionStore]:
+        """Yield each document's extracted sections in input order, reusing cached results when available"""
+        keys = [self._cache_key(path) for path in document_paths]
+        
+        if min(self.workers, len(document_paths)) > 1:
+            per_document = [self._cache_get(key, path) for key, path in zip(keys, document_paths)]
+            jobs = [(path, None) if store is None else None
+                    for path, store in zip(document_paths, per_document)]
+            for i, extracted in enumerate(self._extract_parallel(jobs)):
+                if extracted is not None:
+                    per_document[i] = extracted
+                    self._cache_put(keys[i], extracted)
+                # Release each document once it has been consumed
+                store, per_document[i] = per_document[i], None
+                yield store
+            return
+        
+        for path, key in zip(document_paths, keys):
+            with self.tracer.span("document", document=os.path.basename(path)):
+                store = self._cache_get(key, path)
+                if store is None:
+                    store = self.extract_document_sections(path)
+                    self._cache_put(key, store)
+            yield store
+    
+    def iter_all_sections(self, document_paths: List[str]) -> Iterator[Section]:
+        """Yield sections from every document in input order, reusing cached results when available"""
+        if self.cache is None and min(self.workers, len(document_paths)) <= 1:
+            # Nothing is kept, so sections stream straight from each page
+            for path in document_paths:
+                # Spans the document's extraction and the scoring of its sections
+                with self.tracer.span("document", document=os.path.basename(path)):
+                    yield from self.iter_document_sections(path)
+            return
+        
+        for store in self.iter_document_stores(document_paths):
+            yield from store
+    
+    def extract_all_sections(self, document_paths: List[str]) -> SectionStore:
+        """Extract sections from every document, reusing cached results when available"""
+        return SectionStore.concat(self.iter_document_stores(document_paths))
+    
+    def _cache_get(self, key: Optional[str], pdf_path: str) -> Optional[SectionStore]:
+        if self.cache is None:
+            return None
+        sections = self.cache.get(key, os.path.basename(pdf_path))
+        self.tracer.count("cache_hits" if sections is not None else "cache_misses")
         return sections
     
-    def calculate_relevance_score(self, section: Dict, persona: str, job: str) -> float:
-        """Calculate how relevant a section is to the persona and job"""
-        content = (section["content"] + " " + section["section_title"]).lower()
-        persona_lower = persona.lower()
-        job_lower = job.lower()
+    def _cache_put(self, key: Optional[str], sections: SectionStore):
+        if self.cache is not None:
+            self.cache.put(key, sections)
+    
+    def _extract_parallel(self, jobs: List[Optional[Tuple[str, Optional[Set[int]]]]]) -> Iterator[Optional[SectionStore]]:
+        """Run (pdf_path, pages) extraction jobs in a process pool, yielding results in input order
+
+        None jobs are skipped and yield None in their position.
+        """
+        pending = [i for i, job in enumerate(jobs) if job is not None]
         
-        score = 0.0
+        # Submit the largest PDFs first so the slowest one starts immediately,
+        # but merge in input order so the output matches serial mode exactly
+        pending.sort(key=lambda i: os.path.getsize(jobs[i][0]), reverse=True)
+        extract = self._extract_traced if self.tracer.enabled else self.extract_document_sections
+        with ProcessPoolExecutor(max_workers=min(self.workers, max(len(pending), 1))) as pool:
+            futures = {i: pool.submit(extract, *jobs[i]) for i in pending}
+            for i in range(len(jobs)):
+                if i not in futures:
+                    yield None
+                    continue
+                # The parent records how long it waited on each worker
+                with self.tracer.span("wait_worker", document=os.path.basename(jobs[i][0])):
+                    sections = futures.pop(i).result()
+                if self.tracer.enabled:
+                    sections, recorded = sections
+                    self.tracer.merge(recorded)
+                yield sections
+    
+    def _extract_traced(self, pdf_path: str, pages: Optional[Set[int]] = None) -> Tuple[SectionStore, Dict]:
+        """Worker side of a traced extraction: the sections and what the worker's tracer recorded"""
+        return self.extract_document_sections(pdf_path, pages), self.tracer.export()
+    
+    def scan_page_candidates(self, pdf_path: str, query: CompiledQuery) -> Optional[Dict[int, float]]:
+        """Phase 1 of two-phase retrieval: cheap relevance score per page from bookmarks
+
+        Reading bookmarks costs no page parsing; a bookmark's score carries
+        over to the following pages it covers. Returns None for a PDF without
+        bookmarks, since probing its pages costs as much as extracting them.
+        """
+        page_scores = {}
+        with self.open_pdf(pdf_path) as doc:
+            toc = doc.get_toc(simple=True)
+            if not toc:
+                return None
+            current = 0.0
+            bookmarks = {}
+            for _, title, page in toc:
+                if 1 <= page <= len(doc):
+                    score = query.score_text(title)
+                    bookmarks[page] = max(bookmarks.get(page, 0.0), score)
+            for page_number in range(1, len(doc) + 1):
+                current = bookmarks.get(page_number, current)
+                page_scores[page_number] = current
+        return page_scores
+    
+    def iter_prefiltered_sections(self, document_paths: List[str], query: CompiledQuery) -> Iterator[Section]:
+        """Two-phase retrieval: rank bookmarked pages cheaply, then fully extract only the best ones
+
+        PDFs without bookmarks are extracted in full.
+        """
+        keys = [self._cache_key(path) for path in document_paths]
+        # Cached documents are already fully extracted and need no prefiltering
+        cached = [self._cache_get(key, path) for key, path in zip(keys, document_paths)]
         
-        # Check for persona-related keywords
-        persona_keywords = persona_lower.split()
-        for keyword in persona_keywords:
-            if keyword in content:
-                score += 2.0
+        candidates = []
+        # Pages to extract per document; None extracts every page
+        pages = [None] * len(document_paths)
+        for i, path in enumerate(document_paths):
+            if cached[i] is None:
+                page_scores = self.scan_page_candidates(path, query)
+                if page_scores is not None:
+                    pages[i] = set()
+                    candidates.extend((score, i, page_number) for page_number, score in page_scores.items())
         
-        # Check for job-related keywords
-        job_keywords = job_lower.split()
-        for keyword in job_keywords:
-            if keyword in content:
-                score += 3.0
+        # Keep the best fraction of pages, but never fewer than the sections we report
+        keep = max(math.ceil(len(candidates) * self.two_phase), self.top_k)
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        for _, i, page_number in candidates[:keep]:
+            pages[i].add(page_number)
         
-        # Check for section type relevance
-        for section_type, keywords in self.section_keywords.items():
-            for keyword in keywords:
-                if keyword in content:
-                    score += 1.0
+        jobs = [(path, pages[i]) if cached[i] is None and pages[i] != set() else None
+                for i, path in enumerate(document_paths)]
+        if min(self.workers, len(document_paths)) > 1:
+            extracted = self._extract_parallel(jobs)
+        else:
+            extracted = (self.iter_document_sections(*job) if job is not None else None for job in jobs)
         
-        # Bonus for longer, more substantial content
-        score += min(len(section["content"]) / 1000, 2.0)
+        for sections, partial in zip(cached, extracted):
+            yield from sections if sections is not None else partial or []
+    
+    @property
+    def version(self) -> str:
+        """Identifies the extractor and every setting that changes the output"""
+        version = (f"extractor={self.extractor_version};ranker={self.ranker};legacy={self.legacy_scoring};"
+                   f"top_k={self.top_k};two_phase={self.two_phase}")
+        if self.ranker == "vector":
+            version += f";index_dim={self.index_dim}"
+            if self.index_partition:
+                version += ";index_partition"
+        if self.dedup:
+            version += f";dedup={self.dedup}"
+        if self.refine:
+            version += ";refine"
+        if self.deadline is not None:
+            version += f";deadline={self.deadline}"
+        if self.term_weighting:
+            version += ";term_weighting"
+        return version
+    
+    def compile_query(self, persona: str, job: str) -> CompiledQuery:
+        """Prepare the weighted query terms once per analysis"""
+        keywords = [keyword for keywords in self.section_keywords.values() for keyword in keywords]
+        return CompiledQuery(persona, job, keywords, legacy=self.legacy_scoring)
+    
+    def calculate_relevance_score(self, section: Section, persona: str, job: str) -> float:
+        """Calculate how relevant a section is to the persona and job"""
+        return self.compile_query(persona, job).score(section)
+    
+    def load_index(self, document_paths: List[str]) -> VectorIndex:
+        """Vector index of a collection, reusing the persisted one while its PDFs are unchanged"""
+        if self.index_dir is None:
+            return VectorIndex.build(self.collapse_duplicates(self.extract_all_sections(document_paths)), self.index_dim,
+                                     partition=self.index_partition)
         
-        return score
+        paths = [os.path.abspath(path) for path in document_paths]
+        fingerprint = {
+            "extractor": self.extractor_version,
+            "dedup": self.dedup,
+            "partition": self.index_partition,
+            "pdfs": [[os.path.basename(path), os.path.getsize(path), os.stat(path).st_mtime_ns] for path in paths]
+        }
+        directory = os.path.join(self.index_dir, collection_key(document_paths))
+        index = VectorIndex.load(directory, fingerprint)
+        if index is not None and index.dim == self.index_dim:
+            return index
+        os.makedirs(self.index_dir, exist_ok=True)
+        store = self.collapse_duplicates(self.extract_all_sections(document_paths))
+        return VectorIndex.build(store, self.index_dim, directory, fingerprint, self.index_partition)
+    
+    def load_term_statistics(self, document_paths: List[str]) -> Tuple[TermStatistics, List[str]]:
+        """Saved term statistics of a collection, and the PDFs added or changed since they were saved"""
+        path = None
+        if self.stats_dir is not None:
+            path = os.path.join(self.stats_dir, collection_key(document_paths) + ".json")
+        stats = TermStatistics.load(path, self.extractor_version)
+        return stats, stats.stale(document_paths)
+    
+    def update_term_statistics(self, stats: TermStatistics, stale: List[str], document_paths: List[str],
+                               store: Optional[SectionStore] = None):
+        """Count the terms of stale PDFs and save the statistics if anything changed
+
+        Sections are taken from store, the whole collection's extraction, when
+        one is given; otherwise only the stale PDFs are extracted.
+        """
+        if store is not None:
+            rows = {}
+            for i, document_id in enumerate(store.document_ids):
+                rows.setdefault(store.documents[document_id], []).append(i)
+            stores = (store.subset(rows.get(os.path.basename(path), [])) for path in stale)
+        else:
+            stores = self.iter_document_stores(stale)
+        for path, document_store in zip(stale, stores):
+            stats.add(path, document_store)
+        if stale:
+            logger.info(f"Counted terms of {len(stale)} new or changed documents")
+        if stats.changed and self.stats_dir is not None:
+            stats.save(os.path.join(self.stats_dir, collection_key(document_paths) + ".json"))
+    
+    def term_statistics(self, document_paths: List[str], store: Optional[SectionStore] = None) -> TermStatistics:
+        """Up-to-date term statistics of a collection"""
+        stats, stale = self.load_term_statistics(document_paths)
+        self.update_term_statistics(stats, stale, document_paths, store)
+        return stats
+    
+    def collapse_duplicates(self, store: SectionStore) -> SectionStore:
+        """Keep only the first section of each near-duplicate cluster, when collapsing is enabled"""
+        if not self.dedup or not len(store):
+            return store
+        with self.tracer.span("dedup", sections=len(store)):
+            representatives = duplicate_representatives(store, self.dedup)
+            keep = np.flatnonzero(representatives == np.arange(len(store)))
+        self.tracer.count("duplicates", len(store) - len(keep))
+        if len(keep) < len(store):
+            logger.info(f"Collapsed {len(store) - len(keep)} near-duplicate sections of {len(store)}")
+        return store.subset(keep.tolist())
     
     def analyze_documents(self, document_paths: List[str], persona: str, job: str) -> Dict:
         """Main analysis function for Round 1B"""
-        all_sections = []
+        tracer = self.tracer
+        with tracer.span("analyze_documents", documents=len(document_paths)), tracer.profile():
+            return self._analyze(document_paths, persona, job)
+    
+    def _analyze(self, document_paths: List[str], persona: str, job: str) -> Dict:
+        query = self.compile_query(persona, job)
+        if self.deadline is not None:
+            return self._analyze_anytime(document_paths, persona, job, query)
         
-        # Extract sections from all documents
-        for doc_path in document_paths:
-            sections = self.extract_document_sections(doc_path)
-            all_sections.extend(sections)
+        if self.two_phase:
+            sections = self.iter_prefiltered_sections(document_paths, query)
+        else:
+            sections = self.iter_all_sections(document_paths)
         
-        # Calculate relevance scores
-        for i, section in enumerate(all_sections):
-            score = self.calculate_relevance_score(section, persona, job)
-            all_sections[i]["relevance_score"] = score
+        collection_wide = self.ranker != "vector" and (self.dedup or self.ranker == "bm25" or self.score_workers > 1)
+        if self.term_weighting:
+            with self.tracer.span("load_term_stats"):
+                stats, stale = self.load_term_statistics(document_paths)
+            # New PDFs have to be extracted to be counted, so extract the whole
+            # collection once instead of again while streaming
+            collection_wide = collection_wide or bool(stale and not self.two_phase and not self.low_memory)
         
-        # Sort by relevance and assign importance ranks
-        all_sections.sort(key=lambda x: x["relevance_score"], reverse=True)
+        full_store = None
+        if collection_wide:
+            # Collection-wide steps need every section stored first
+            if self.two_phase:
+                sections = SectionStore.from_sections(sections)
+            else:
+                sections = full_store = self.extract_all_sections(document_paths)
+        if self.term_weighting:
+            with self.tracer.span("update_term_stats", documents=len(stale)):
+                self.update_term_statistics(stats, stale, document_paths, full_store)
+            query = query.weighted(stats.idf)
+        if collection_wide:
+            sections = self.collapse_duplicates(sections)
         
-        # Take top 10 most relevant sections
-        top_sections = all_sections[:10]
+        # Calculate relevance scores
+        if self.ranker == "vector":
+            # The index always covers every page, so two-phase prefiltering does not apply
+            with self.tracer.span("load_index"):
+                index = self.load_index(document_paths)
+            with self.tracer.span("vector_search", sections=len(index)):
+                top_sections = [index.section(row) for _, row in index.search(query.query_weights, self.top_k)]
+        elif self.ranker == "bm25":
+            # BM25 needs collection-wide term statistics, so it scores the stored collection
+            store = sections
+            with self.tracer.span("bm25", sections=len(store)):
+                matrix = TermMatrix(section_terms(section) for section in store)
+                scores = bm25_scores(matrix, query.query_weights)
+            top_sections = [store[i] for i in select_top_k(zip(scores.tolist(), range(len(store))), self.top_k)]
+        elif self.score_workers > 1:
+            store = sections
+            with self.tracer.span("shared_score", sections=len(store), workers=self.score_workers), \
+                    SharedScorer(store, self.score_workers) as scorer:
+                top_sections = [store[i] for _, i in scorer.top_k(query, self.top_k)]
+        else:
+            # Sections stream straight from extraction into the top-k heap
+            top_sections = select_top_k(self._score_stream(query, sections), self.top_k)
+
+        with self.tracer.span("build_result"):
+            return self.build_result(document_paths, persona, job, top_sections)
+    
+    def document_priorities(self, document_paths: List[str], query: CompiledQuery) -> List[Tuple[int, int]]:
+        """(input index, page count) of each document, most promising first
+
+        A document's promise is the query score of its file name, metadata
+        title and bookmark titles, none of which needs page parsing. Equal
+        scores keep input order.
+        """
+        ranked = []
+        for i, path in enumerate(document_paths):
+            with self.open_pdf(path) as doc:
+                titles = [Path(path).stem.replace("_", " "), (doc.metadata or {}).get("title", "") or ""]
+                titles.extend(title for _, title, _ in doc.get_toc(simple=True))
+                ranked.append((-query.score_text(" ".join(titles)), i, doc.page_count))
+        ranked.sort()
+        return [(i, page_count) for _, i, page_count in ranked]
+    
+    def iter_anytime_scored(self, document_paths: List[str], query: CompiledQuery, stop_at: float,
+                            order: List[Tuple[int, int]], covered: List[List[int]]) -> Iterator[Tuple[Tuple, Section]]:
+        """Score sections document by document in priority order until stop_at (a time.monotonic() value)
+
+        Each document may use the time left minus what the documents after it
+        need at the pace measured so far, and at least a share of the time
+        left when it starts in proportion to its pages among those not yet
+        read, so time a quick document does not use carries over to later
+        ones. The first DEADLINE_PACE_PAGES pages of a document are read in
+        order; after that, once reading every remaining page at the pace of
+        its pages after the first would overrun its time, only evenly spaced
+        pages are read. Scores come with the section's position in input
+        order, so ties rank as in a full analysis. The page numbers read are
+        appended to covered, per input document.
+        """
+        tracer = self.tracer
+        guard = MemoryGuard(self.max_rss_mb) if self.low_memory else None
+        pages_left = sum(page_count for _, page_count in order)
+        # Seconds spent opening documents and reading their first pages, and
+        # reading every later page, with the counts of each, across documents
+        opening_time = paced_time = 0.0
+        opened = paced_pages = 0
+        for documents_left, (i, page_count) in zip(range(len(order) - 1, -1, -1), order):
+            now = time.monotonic()
+            if now >= stop_at:
+                return
+            share_end = now + (stop_at - now) * page_count / max(1, pages_left)
+            pages_left -= page_count
+            document = os.path.basename(document_paths[i])
+            seq = 0
+            started = now
+            # When the document's first and latest pages finished reading
+            first_read = last_read = None
+            with tracer.span("document", document=document), \
+                    self.open_pdf(document_paths[i]) as doc:
+                page_num = 0
+                while page_num < page_count:
+                    with tracer.span("get_text", document=document, page=page_num + 1):
+                        text, spans = self.read_page(doc[page_num])
+                    if guard is not None:
+                        guard.check(f" after page {page_num + 1} of {document}")
+                    tracer.count("pages")
+                    covered[i].append(page_num + 1)
+                    for section in self.split_page_sections(text, spans, document, page_num + 1):
+                        yield (query.score(section), -i, -seq), section
+                        seq += 1
+                    
+                    now = time.monotonic()
+                    if first_read is None:
+                        # Opening the PDF and its first page load fonts and resources, so they do not set the pace
+                        first_read = now
+                        opening_time += now - started
+                        opened += 1
+                    else:
+                        paced_time += now - last_read
+                        paced_pages += 1
+                    last_read = now
+                    if now >= stop_at:
+                        return
+                    left = page_count - page_num - 1
+                    if not left:
+                        break
+                    if len(covered[i]) < DEADLINE_PACE_PAGES:
+                        page_num += 1
+                        continue
+                    later = pages_left * paced_time / paced_pages + documents_left * opening_time / opened
+                    end = max(share_end, stop_at - later)
+                    if now >= end:
+                        break
+                    # Step over pages when the rest, at this document's pace, would not fit its time
+                    needed = (now - first_read) / (len(covered[i]) - 1) * left
+                    page_num += max(1, math.ceil(needed / (end - now)))
+    
+    def _analyze_anytime(self, document_paths: List[str], persona: str, job: str, query: CompiledQuery) -> Dict:
+        start = time.monotonic()
+        stop_at = start + self.deadline * (1 - DEADLINE_RESERVE)
+        with self.tracer.span("prioritize", documents=len(document_paths)):
+            order = self.document_priorities(document_paths, query)
+        covered = [[] for _ in document_paths]
+        top_sections = select_top_k(self.iter_anytime_scored(document_paths, query, stop_at, order, covered),
+                                    self.top_k)
         
-        for i, section in enumerate(top_sections):
-            section["importance_rank"] = i + 1
-            del section["relevance_score"]  # Remove internal scoring
+        with self.tracer.span("build_result"):
+            result = self.build_result(document_paths, persona, job, top_sections)
+        page_counts = dict(order)
+        documents = [
+            {
+                "document": os.path.basename(path),
+                "pages": page_counts[i],
+                "pages_covered": sorted(covered[i])
+            }
+            for i, path in enumerate(document_paths)
+        ]
+        complete = all(len(entry["pages_covered"]) == entry["pages"] for entry in documents)
+        if not complete:
+            logger.info(f"Deadline of {self.deadline}s reached after reading "
+                        f"{sum(map(len, covered))} of {sum(page_counts.values())} pages")
+        result["metadata"]["coverage"] = {
+            "deadline_seconds": self.deadline,
+            "elapsed_seconds": round(time.monotonic() - start, 3),
+            "complete": complete,
+            "documents": documents
+        }
+        return result
+    
+    def _score_stream(self, query: CompiledQuery, sections: Iterable[Section]) -> Iterator[Tuple[float, Section]]:
+        tracer = self.tracer
+        if not tracer.enabled:
+            for section in sections:
+                yield query.score(section), section
+            return
         
+        # Per-section spans would swamp the trace, so scoring time is accumulated
+        checks = len(query.weights)
+        for section in sections:
+            start = time.perf_counter()
+            score = query.score(section)
+            tracer.add_time("score", time.perf_counter() - start)
+            tracer.count("scored")
+            tracer.count("keyword_checks", checks)
+            yield score, section
+    
+    def build_corpus(self, document_paths: List[str]) -> "SectionCorpus":
+        """Extract a collection once so it can be ranked for many queries"""
+        return SectionCorpus(self, document_paths)
+    
+    def build_result(self, document_paths: List[str], persona: str, job: str,
+                     top_sections: List[Section], collections: Optional[List[str]] = None) -> Dict:
+        """Assemble the Round 1B output for the ranked top sections
+
+        When collections is given, it names the collection each top section
+        came from and is recorded on every entry.
+        """
         # Create subsections (extract key parts from top sections)
         subsections = []
-        for section in top_sections[:5]:  # Top 5 for subsections
-            content_lines = section["content"].split('\n')
-            # Take first few meaningful lines as refined text
-            refined_lines = [line.strip() for line in content_lines if len(line.strip()) > 20]
-            refined_text = ' '.join(refined_lines[:3])  # First 3 substantial lines
+        if self.refine:
+            with self.tracer.span("refine"):
+                # The title starts the content and is already reported in extracted_sections
+                refined_texts = refine_texts([section.content[len(section.section_title):]
+                                              for section in top_sections[:5]],
+                                             self.compile_query(persona, job).query_weights)
+        for i, section in enumerate(top_sections[:5]):  # Top 5 for subsections
+            if self.refine:
+                refined_text = refined_texts[i]
+            else:
+                content_lines = section.content.split('\n')
+                # Take first few meaningful lines as refined text
+                refined_lines = [line.strip() for line in content_lines if len(line.strip()) > 20]
+                refined_text = ' '.join(refined_lines[:3])  # First 3 substantial lines
             
             if refined_text:
-                subsections.append({
-                    "document": section["document"],
-                    "refined_text": refined_text[:500],  # Limit length
-                    "page_number": section["page_number"]
-                })
+                subsection = asdict(SubSection(
+                    document=section.document,
+                    refined_text=refined_text[:500],  # Limit length
+                    page_number=section.page_number
+                ))
+                if collections is not None:
+                    subsection["collection"] = collections[i]
+                subsections.append(subsection)
         
         # Prepare output
         result = {
@@ -164,79 +900,409 @@ class PersonaDocumentAnalyzer:
             },
             "extracted_sections": [
                 {
-                    "document": section["document"],
-                    "page_number": section["page_number"],
-                    "section_title": section["section_title"],
-                    "importance_rank": section["importance_rank"]
+                    "document": section.document,
+                    "page_number": section.page_number,
+                    "section_title": section.section_title,
+                    "importance_rank": rank
                 }
-                for section in top_sections
+                for rank, section in enumerate(top_sections, start=1)
             ],
             "subsection_analysis": subsections
         }
+        if collections is not None:
+            for entry, collection in zip(result["extracted_sections"], collections):
+                entry["collection"] = collection
         
         return result
 
-def main():
-    input_dir = Path("/app/input")
-    output_dir = Path("/app/output")
+class SectionCorpus:
+    """A document collection extracted once and ranked for any number of persona/job queries
+
+    Two-phase retrieval is query dependent, so a corpus always extracts every page.
+    """
+    
+    def __init__(self, analyzer: PersonaDocumentAnalyzer, document_paths: List[str],
+                 sections: Optional[SectionStore] = None):
+        self.analyzer = analyzer
+        self.document_paths = list(document_paths)
+        # Already extracted sections (in document order) may be passed in
+        if sections is None:
+            sections = analyzer.extract_all_sections(self.document_paths)
+        # Statistics count every extracted section, before duplicates are collapsed
+        self.stats = analyzer.term_statistics(self.document_paths, sections) if analyzer.term_weighting else None
+        self.sections = analyzer.collapse_duplicates(sections)
+        # Tokenized once and shared by every query
+        self.matrix = TermMatrix(section_terms(section) for section in self.sections)
+        self.length_bonus = np.minimum(np.array(self.sections.content_lengths(), dtype=np.float64) / 1000, 2.0)
+        self._index = None
+        self._scorer = None
+    
+    @property
+    def index(self) -> VectorIndex:
+        if self._index is None:
+            self._index = VectorIndex.build(self.sections, self.analyzer.index_dim,
+                                            partition=self.analyzer.index_partition)
+        return self._index
+    
+    def close(self):
+        """Stop the scoring workers and free the shared corpus, if they were started"""
+        if self._scorer is not None:
+            self._scorer.close()
+            self._scorer = None
+    
+    def search(self, persona: str, job: str) -> List[Tuple[float, Section]]:
+        """The top (score, section) pairs for one persona/job pair, best first"""
+        analyzer = self.analyzer
+        query = analyzer.compile_query(persona, job)
+        if self.stats is not None:
+            query = query.weighted(self.stats.idf)
+        
+        if analyzer.ranker == "vector":
+            return [(score, self.index.section(row))
+                    for score, row in self.index.search(query.query_weights, analyzer.top_k)]
+        if analyzer.ranker == "bm25":
+            scores = bm25_scores(self.matrix, query.query_weights).tolist()
+        elif query.legacy and analyzer.score_workers > 1:
+            # Substring scoring cannot use the term matrix, so it is spread over processes
+            if self._scorer is None:
+                self._scorer = SharedScorer(self.sections, analyzer.score_workers)
+            return [(score, self.sections[i]) for score, i in self._scorer.top_k(query, analyzer.top_k)]
+        elif query.legacy:
+            scores = [query.score(section) for section in self.sections]
+        else:
+            scores = (keyword_scores(self.matrix, query.weights) + self.length_bonus).tolist()
+        
+        # Only the winners are materialized as Section objects
+        top = select_top_k(((score, (score, i)) for i, score in enumerate(scores)), analyzer.top_k)
+        return [(score, self.sections[i]) for score, i in top]
+    
+    def rank(self, persona: str, job: str) -> Dict:
+        """Round 1B output for one persona/job pair"""
+        top_sections = [section for _, section in self.search(persona, job)]
+        return self.analyzer.build_result(self.document_paths, persona, job, top_sections)
+
+def read_query(metadata: Dict) -> Tuple[str, str]:
+    """Persona and job from an input JSON or batch query record
+
+    Accepts the challenge layout ({"persona": {"role": ...}, "job_to_be_done":
+    {"task": ...}}) as well as plain strings under "persona" and "job".
+    """
+    persona = metadata.get("persona", "")
+    if isinstance(persona, dict):
+        persona = persona.get("role", "")
+    job = metadata.get("job_to_be_done", metadata.get("job", ""))
+    if isinstance(job, dict):
+        job = job.get("task", "")
+    return persona, job
+
+def run_batch(analyzer: PersonaDocumentAnalyzer, document_paths: List[str],
+              queries_path: Path, output_dir: Path) -> int:
+    """Rank one corpus for every query in a JSONL file, writing one output JSON per query"""
+    corpus = analyzer.build_corpus(document_paths)
+    logger.info(f"Extracted {len(corpus.sections)} sections from {len(document_paths)} documents")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    written = 0
+    try:
+        with open(queries_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                persona, job = read_query(record)
+                if not persona or not job:
+                    logger.warning(f"Missing persona or job on line {line_number} of {queries_path}")
+                    continue
+                
+                query_id = str(record.get("id", f"query_{line_number}"))
+                # Ids name files in output_dir, so they cannot hold paths
+                if "/" in query_id or "\\" in query_id or query_id.startswith(".") or "\0" in query_id:
+                    logger.warning(f"Skipping line {line_number} of {queries_path}: invalid id '{query_id}'")
+                    continue
+                output_path = output_dir / f"{query_id}_output.json"
+                with open(output_path, 'w', encoding='utf-8') as out:
+                    json.dump(corpus.rank(persona, job), out, indent=2, ensure_ascii=False)
+                written += 1
+    finally:
+        corpus.close()
+    
+    logger.info(f"Saved {written} outputs to {output_dir}")
+    return written
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Round 1B persona-driven document analysis")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used for PDF extraction (0 = one per CPU)")
+    parser.add_argument("--score-workers", type=int, default=1,
+                        help="processes that score the stored collection in parallel from shared memory "
+                             "(heuristic ranker)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory for the persistent extracted-section cache")
+    parser.add_argument("--cache-size-mb", type=int, default=256,
+                        help="evict least-recently-used cache entries past this size")
+    parser.add_argument("--legacy-scoring", action="store_true",
+                        help="score with the original substring matching")
+    parser.add_argument("--ranker", choices=RANKERS, default="heuristic",
+                        help="ranking backend for extracted sections")
+    parser.add_argument("--index-dir", default=None,
+                        help="where --ranker vector persists its indexes (default: <output-dir>/.vector-index)")
+    parser.add_argument("--index-dim", type=int, default=DEFAULT_DIM,
+                        help="hashed feature dimensions per section for --ranker vector")
+    parser.add_argument("--index-partition", action="store_true",
+                        help="partition indexes of 4096+ sections by k-means for faster, approximate "
+                             "--ranker vector search (default: exact)")
+    parser.add_argument("--dedup", type=float, nargs="?", const=DEFAULT_SIMILARITY, default=0.0, metavar="SIMILARITY",
+                        help="rank only the first of sections whose estimated Jaccard similarity "
+                             f"reaches SIMILARITY, between 0 and 1 (default {DEFAULT_SIMILARITY} when given)")
+    parser.add_argument("--refine", action="store_true",
+                        help="fill subsection_analysis with the most relevant non-redundant sentences")
+    parser.add_argument("--term-weighting", action="store_true",
+                        help="scale keyword weights by their rarity in the collection (heuristic ranker)")
+    parser.add_argument("--stats-dir", default=None,
+                        help="where --term-weighting keeps per-collection term statistics "
+                             "(default: <output-dir>/.term-stats)")
+    parser.add_argument("--segmentation", choices=SEGMENTATIONS, default="paragraphs",
+                        help="cut sections at blank lines of the plain text, or at headings and text blocks")
+    parser.add_argument("--two-phase", type=float, default=0.0, metavar="FRACTION",
+                        help="only fully extract the best FRACTION of pages from a cheap first pass")
+    parser.add_argument("--input-dir", default="/app/input",
+                        help="directory of collection folders")
+    parser.add_argument("--output-dir", default="/app/output",
+                        help="directory for output JSON files")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip collections whose inputs are unchanged since the last run")
+    parser.add_argument("--trace", action="store_true",
+                        help="write a Chrome trace of spans and counters next to each output")
+    parser.add_argument("--profile", action="store_true",
+                        help="also capture a cProfile .prof file per collection (implies --trace)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="stream PDFs from disk one page at a time (heuristic ranker, one process, no cache)")
+    parser.add_argument("--max-rss-mb", type=float, default=500.0,
+                        help="fail a collection whose resident memory exceeds this with --low-memory")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDS",
+                        help="return the best sections found within SECONDS per collection, sampling pages "
+                             "when time runs short (heuristic ranker)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap input reads, analysis and output writes across collections; "
+                             "--workers analyzes that many collections at once")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="collections read ahead of the analysis with --pipeline")
+    parser.add_argument("--schedule", action="store_true",
+                        help="share one worker pool across all collections, largest documents first")
+    parser.add_argument("--memory-budget-mb", type=float, default=400.0,
+                        help="estimated memory allowed for concurrent extractions with --schedule")
+    parser.add_argument("--batch", default=None, metavar="QUERIES_JSONL",
+                        help="rank the PDFs in --pdf-dir once per persona/job line of a JSONL file")
+    parser.add_argument("--pdf-dir", default=None,
+                        help="PDF folder used with --batch")
+    parser.add_argument("--search", default=None, metavar="QUERY_JSON",
+                        help="rank sections across every collection under --input-dir for the persona and job "
+                             "in QUERY_JSON, writing <output-dir>/search_output.json")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    input_dir = Path(args.input_dir)
+    output_dir = Path(args.output_dir)
 
     os.makedirs(output_dir, exist_ok=True)
 
-    analyzer = PersonaDocumentAnalyzer()
+    cache = None
+    if (args.incremental or args.search) and not args.cache_dir:
+        # Unchanged PDFs of a changed collection are then served from the cache
+        args.cache_dir = str(output_dir / ".section-cache")
+    if args.cache_dir:
+        cache = SectionCache(args.cache_dir, args.cache_size_mb * 1024 * 1024, extractor_version(args.segmentation))
+
+    # Combinations with run modes are checked here; the analyzer checks its own options
+    if args.low_memory and (args.batch or args.schedule):
+        logger.error("--low-memory cannot be combined with --batch or --schedule, "
+                     "which keep whole collections in memory")
+        return
+    if args.deadline is not None and (args.batch or args.schedule):
+        logger.error("--deadline cannot be combined with --batch or --schedule")
+        return
+    if args.schedule and (args.two_phase or args.trace or args.profile):
+        logger.error("--schedule cannot be combined with --two-phase, --trace or --profile")
+        return
+    if args.pipeline and (args.low_memory or args.batch or args.schedule or args.search or args.trace or args.profile):
+        logger.error("--pipeline cannot be combined with --low-memory, --batch, --schedule, --search, "
+                     "--trace or --profile")
+        return
+    if args.term_weighting and not args.stats_dir:
+        args.stats_dir = str(output_dir / ".term-stats")
+    if args.ranker == "vector" and not args.index_dir:
+        args.index_dir = str(output_dir / ".vector-index")
+
+    try:
+        analyzer = PersonaDocumentAnalyzer(workers=args.workers, cache=cache,
+                                           legacy_scoring=args.legacy_scoring,
+                                           ranker=args.ranker,
+                                           two_phase=args.two_phase,
+                                           low_memory=args.low_memory,
+                                           max_rss_mb=args.max_rss_mb,
+                                           index_dir=args.index_dir,
+                                           index_dim=args.index_dim,
+                                           index_partition=args.index_partition,
+                                           dedup=args.dedup,
+                                           refine=args.refine,
+                                           deadline=args.deadline,
+                                           term_weighting=args.term_weighting,
+                                           stats_dir=args.stats_dir,
+                                           score_workers=args.score_workers,
+                                           segmentation=args.segmentation)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.batch:
+        if not args.pdf_dir:
+            logger.error("--batch requires --pdf-dir")
+            return
+        pdf_files = sorted(Path(args.pdf_dir).glob("*.pdf"))
+        if not pdf_files:
+            logger.error(f"No PDF files found in {args.pdf_dir}")
+            return
+        run_batch(analyzer, [str(pdf) for pdf in pdf_files], Path(args.batch), output_dir)
+        return
 
     if not input_dir.exists():
         logger.error(f"Input directory {input_dir} does not exist.")
         return
 
-    for test_case_folder in input_dir.iterdir():
-        if not test_case_folder.is_dir():
-            continue
+    if args.search:
+        # Imported here because the shard search itself builds on this module
+        from shards import run_search
+        try:
+            run_search(input_dir, Path(args.search), output_dir / "search_output.json", analyzer,
+                       workers=analyzer.workers)
+        except ValueError as e:
+            logger.error(str(e))
+        return
 
-        logger.info(f"Processing test case folder: {test_case_folder.name}")
+    if args.pipeline:
+        # Imported here because the pipeline itself builds on this module
+        from pipeline import run_pipeline
+        run_pipeline(input_dir, output_dir, analyzer, workers=analyzer.workers,
+                     prefetch=args.prefetch, incremental=args.incremental)
+        return
 
-        # Find the JSON metadata file
-        json_files = list(test_case_folder.glob("*.json"))
-        if not json_files:
-            logger.warning(f"No JSON metadata file found in {test_case_folder}")
-            continue
+    if args.schedule:
+        # Imported here because the scheduler itself builds on this module
+        from scheduler import run_scheduled
+        run_scheduled(input_dir, output_dir, analyzer, workers=args.workers,
+                      memory_budget_mb=args.memory_budget_mb, incremental=args.incremental)
+        return
 
-        metadata_path = json_files[0]
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            metadata = json.load(f)
+    for test_case_folder in sorted(input_dir.iterdir()):
+        if test_case_folder.is_dir():
+            process_collection(test_case_folder, output_dir, analyzer, incremental=args.incremental,
+                               trace=args.trace or args.profile, profile=args.profile)
 
-        persona = metadata.get("persona", {}).get("role", "")
-        job = metadata.get("job_to_be_done", {}).get("task", "")
+@dataclass
+class CollectionJob:
+    """A collection folder's validated inputs and where its output goes"""
+    name: str
+    metadata_path: Path
+    persona: str
+    job: str
+    pdf_paths: List[Path]
+    output_path: Path
 
-        if not persona or not job:
-            logger.warning(f"Missing persona or job in metadata for {test_case_folder.name}")
-            continue
+def load_collection(test_case_folder: Path, output_dir: Path) -> Optional[CollectionJob]:
+    """Read a collection folder's metadata and PDF list, or None if it is unusable"""
+    # Find the JSON metadata file; collections may also ship a golden
+    # *_output.json next to it, so prefer the input file
+    json_files = sorted(test_case_folder.glob("*input.json")) or sorted(test_case_folder.glob("*.json"))
+    if not json_files:
+        logger.warning(f"No JSON metadata file found in {test_case_folder}")
+        return None
 
-        pdf_dir = test_case_folder / "PDFs"
-        if not pdf_dir.exists():
-            logger.warning(f"No PDFs directory found in {test_case_folder}")
-            continue
+    metadata_path = json_files[0]
+    with open(metadata_path, 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
 
-        pdf_files = list(pdf_dir.glob("*.pdf"))
-        if not pdf_files:
-            logger.warning(f"No PDF files found in {pdf_dir}")
-            continue
+    persona, job = read_query(metadata)
 
-        # Analyze
-        try:
-            result = analyzer.analyze_documents([str(pdf) for pdf in pdf_files], persona, job)
+    if not persona or not job:
+        logger.warning(f"Missing persona or job in metadata for {test_case_folder.name}")
+        return None
+
+    pdf_dir = test_case_folder / "PDFs"
+    if not pdf_dir.exists():
+        logger.warning(f"No PDFs directory found in {test_case_folder}")
+        return None
+
+    pdf_files = sorted(pdf_dir.glob("*.pdf"))
+    if not pdf_files:
+        logger.warning(f"No PDF files found in {pdf_dir}")
+        return None
+
+    output_filename = metadata_path.stem + "_output.json"
+    output_path = output_dir / test_case_folder.name / output_filename
+    return CollectionJob(test_case_folder.name, metadata_path, persona, job, pdf_files, output_path)
+
+def is_up_to_date(collection: CollectionJob, analyzer: PersonaDocumentAnalyzer) -> Tuple[bool, CollectionManifest]:
+    """Check a collection against its manifest for incremental runs"""
+    manifest = CollectionManifest(collection.output_path.parent)
+    changes = manifest.check(analyzer.version, collection.metadata_path,
+                             collection.pdf_paths, collection.output_path)
+    if not changes:
+        logger.info(f"Skipping unchanged collection {collection.name}")
+        if manifest.current != manifest.previous:
+            manifest.save()  # refresh touched-but-identical mtimes
+        return True, manifest
+    logger.info(f"Changed since last run: {', '.join(changes)}")
+    return False, manifest
+
+def write_result(collection: CollectionJob, result: Dict):
+    collection.output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(collection.output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    logger.info(f"Saved output to {collection.output_path}")
+
+def process_collection(test_case_folder: Path, output_dir: Path, analyzer: PersonaDocumentAnalyzer,
+                       incremental: bool = False, trace: bool = False, profile: bool = False) -> Optional[Path]:
+    """Analyze one collection folder and write its output JSON
+
+    With incremental=True, a manifest of the inputs is kept next to the output
+    and the collection is skipped when nothing changed since the last run.
+    With trace=True, a Chrome trace (and with profile=True a cProfile dump) is
+    written beside the output. Returns the output path, or None if the
+    collection was skipped or failed.
+    """
+    logger.info(f"Processing test case folder: {test_case_folder.name}")
 
-            output_subdir = output_dir / test_case_folder.name
-            output_subdir.mkdir(parents=True, exist_ok=True)
+    collection = load_collection(test_case_folder, output_dir)
+    if collection is None:
+        return None
 
-            output_filename = metadata_path.stem + "_output.json"
-            output_path = output_subdir / output_filename
+    manifest = None
+    if incremental:
+        up_to_date, manifest = is_up_to_date(collection, analyzer)
+        if up_to_date:
+            return None
 
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+    if trace:
+        analyzer.tracer = Tracer(profile=profile)
 
-            logger.info(f"Saved output to {output_path}")
-        except Exception as e:
-            logger.error(f"Error processing {test_case_folder.name}: {str(e)}")
+    # Analyze
+    try:
+        result = analyzer.analyze_documents([str(pdf) for pdf in collection.pdf_paths],
+                                            collection.persona, collection.job)
+        write_result(collection, result)
+        if manifest is not None:
+            manifest.save()
+        if trace:
+            trace_path = collection.output_path.with_suffix(".trace.json")
+            analyzer.tracer.write(str(trace_path))
+            logger.info(f"Saved trace to {trace_path}")
+        return collection.output_path
+    except Exception as e:
+        logger.error(f"Error processing {test_case_folder.name}: {str(e)}")
+        return None
+    finally:
+        analyzer.tracer = NULL_TRACER
 
 if __name__ == "__main__":
     main()
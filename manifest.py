@@ -0,0 +1,82 @@
+# Adobe India Hackathon - Connecting the Dots
+# Per-collection manifest of inputs and outputs for incremental runs
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Optional
+
+MANIFEST_NAME = ".manifest.json"
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint(path: Path, previous: Optional[Dict] = None) -> Dict:
+    """Size, mtime and content hash of a file
+
+    The hash is carried over from the previous fingerprint when size and
+    mtime are unchanged, so unchanged files are never re-read.
+    """
+    stat = os.stat(path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        return previous
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+class CollectionManifest:
+    """Records what produced a collection's output so unchanged collections can be skipped"""
+
+    def __init__(self, output_subdir: Path):
+        self.path = output_subdir / MANIFEST_NAME
+        self.previous = self._load()
+        self.current = {}
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def check(self, version: str, metadata_path: Path, pdf_paths: List[Path], output_path: Path) -> List[str]:
+        """Fingerprint the inputs and list what changed since the last run
+
+        An empty list means the recorded output is still up to date.
+        """
+        previous_pdfs = self.previous.get("pdfs", {})
+        self.current = {
+            "analyzer_version": version,
+            "input": {
+                "name": metadata_path.name,
+                **fingerprint(metadata_path, self.previous.get("input"))
+            },
+            "pdfs": {pdf.name: fingerprint(pdf, previous_pdfs.get(pdf.name)) for pdf in pdf_paths},
+            "output": output_path.name
+        }
+
+        if not self.previous:
+            return ["no previous run"]
+
+        changes = []
+        if self.previous.get("analyzer_version") != version:
+            changes.append("analyzer version")
+        if self.previous.get("input", {}).get("sha256") != self.current["input"]["sha256"]:
+            changes.append(metadata_path.name)
+        for name, current in self.current["pdfs"].items():
+            if previous_pdfs.get(name, {}).get("sha256") != current["sha256"]:
+                changes.append(name)
+        changes.extend(f"{name} (removed)" for name in previous_pdfs if name not in self.current["pdfs"])
+        if self.previous.get("output") != output_path.name or not output_path.exists():
+            changes.append("missing output")
+        return changes
+
+    def save(self):
+        """Record the inputs fingerprinted by check() after a successful run"""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.current, f, indent=2)
+        os.replace(tmp_path, self.path)
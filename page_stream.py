@@ -0,0 +1,88 @@
+# Adobe India Hackathon - Connecting the Dots
+# Memory-bounded page streaming for very large PDFs
+
+import gc
+import logging
+import os
+import sys
+from typing import Any, Callable, Iterator, Optional, Set, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+class MemoryCeilingExceeded(RuntimeError):
+    """Resident memory stayed above the configured ceiling after releasing caches"""
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        # Without /proc only the peak is available, which can only overestimate
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def open_streamed(pdf_path: str) -> fitz.Document:
+    """Open a PDF by path, so MuPDF reads the file on demand
+
+    MuPDF seeks and reads through its own file stream, so the file's bytes
+    are never copied onto the Python heap. Passing a stream would need a
+    bytes copy of the whole file, since PyMuPDF 1.23 does not accept a
+    memoryview over a memory map.
+    """
+    return fitz.open(pdf_path, filetype="pdf")
+
+class MemoryGuard:
+    """Keeps resident memory under a ceiling while pages are processed
+
+    Past the soft limit, MuPDF's object cache is emptied and the garbage
+    collector runs. If memory is still over the ceiling after that,
+    MemoryCeilingExceeded is raised instead of letting the process grow.
+    """
+
+    def __init__(self, ceiling_mb: float, soft_fraction: float = 0.8):
+        self.ceiling_mb = ceiling_mb
+        self.soft_mb = ceiling_mb * soft_fraction
+        self.peak_mb = 0.0
+        self.releases = 0
+
+    def check(self, where: str = "") -> float:
+        rss = current_rss_mb()
+        if rss >= self.soft_mb:
+            # Emptying the cache costs re-parsing fonts on later pages, so only under pressure
+            fitz.TOOLS.store_shrink(100)
+            gc.collect()
+            self.releases += 1
+            rss = current_rss_mb()
+            if rss > self.ceiling_mb:
+                raise MemoryCeilingExceeded(
+                    f"Resident memory {rss:.0f} MB exceeds the {self.ceiling_mb:.0f} MB ceiling{where}")
+            if rss >= self.soft_mb:
+                # What is left is not cache; release again only once memory grows further
+                self.soft_mb = (rss + self.ceiling_mb) / 2
+        self.peak_mb = max(self.peak_mb, rss)
+        return rss
+
+def iter_streamed_pages(pdf_path: str, guard: MemoryGuard, pages: Optional[Set[int]] = None,
+                        read: Callable[[fitz.Page], Any] = fitz.Page.get_text) -> Iterator[Tuple[int, Any]]:
+    """Yield (page number, read(page)) one page at a time from a PDF read on demand
+
+    read defaults to the page's plain text. Each page object, and the text
+    page built for it, is released before the next page is loaded, and
+    memory is checked against the guard in between.
+    """
+    document = os.path.basename(pdf_path)
+    with open_streamed(pdf_path) as doc:
+        for page_num in range(doc.page_count):
+            if pages is not None and page_num + 1 not in pages:
+                continue
+            page = doc.load_page(page_num)
+            # read builds a TextPage and frees it before returning
+            text = read(page)
+            del page
+            guard.check(f" after page {page_num + 1} of {document}")
+            yield page_num + 1, text
+    logger.debug(f"Streamed {document}, peak resident memory {guard.peak_mb:.0f} MB")
@@ -0,0 +1,118 @@
+# Adobe India Hackathon - Connecting the Dots
+# Pipelined runner overlapping input reads, analysis and output writes
+
+import asyncio
+import copy
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict
+
+from main import CollectionJob, PersonaDocumentAnalyzer, is_up_to_date, load_collection, write_result
+
+logger = logging.getLogger(__name__)
+
+# Threads for file reads and writes; they wait on storage, not the CPU
+IO_THREADS = 8
+
+def _analyze_loaded(analyzer: PersonaDocumentAnalyzer, collection: CollectionJob,
+                    sources: Dict[str, bytes]) -> Dict:
+    """Analyze a collection whose PDF bytes were read ahead, in an executor"""
+    analyzer.sources = sources
+    try:
+        return analyzer.analyze_documents([str(pdf) for pdf in collection.pdf_paths],
+                                          collection.persona, collection.job)
+    finally:
+        analyzer.sources = {}
+
+def _write(collection: CollectionJob, manifest, result: Dict) -> Path:
+    write_result(collection, result)
+    if manifest is not None:
+        manifest.save()
+    return collection.output_path
+
+async def _read_stage(folders: List[Path], output_dir: Path, analyzer: PersonaDocumentAnalyzer,
+                      incremental: bool, io_pool: Executor, loaded: asyncio.Queue, consumers: int):
+    """Read each collection's input JSON and PDF bytes ahead of the analysis"""
+    loop = asyncio.get_running_loop()
+    for folder in folders:
+        collection = await loop.run_in_executor(io_pool, load_collection, folder, output_dir)
+        if collection is None:
+            continue
+        manifest = None
+        if incremental:
+            up_to_date, manifest = await loop.run_in_executor(io_pool, is_up_to_date, collection, analyzer)
+            if up_to_date:
+                continue
+        # Every PDF of the collection is requested at once, so storage latency overlaps
+        blobs = await asyncio.gather(*(loop.run_in_executor(io_pool, Path.read_bytes, pdf)
+                                       for pdf in collection.pdf_paths))
+        sources = {str(pdf): blob for pdf, blob in zip(collection.pdf_paths, blobs)}
+        # Waits while the queue is full, which bounds the bytes held ahead of the analysis
+        await loaded.put((collection, manifest, sources))
+    for _ in range(consumers):
+        await loaded.put(None)
+
+async def _analyze_stage(analyzer: PersonaDocumentAnalyzer, cpu_pool: Executor,
+                         loaded: asyncio.Queue, analyzed: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await loaded.get()
+        if item is None:
+            break
+        collection, manifest, sources = item
+        try:
+            result = await loop.run_in_executor(cpu_pool, _analyze_loaded, analyzer, collection, sources)
+        except Exception as e:
+            logger.error(f"Error processing {collection.name}: {str(e)}")
+            continue
+        await analyzed.put((collection, manifest, result))
+
+async def _write_stage(io_pool: Executor, analyzed: asyncio.Queue, written: List[Path]):
+    loop = asyncio.get_running_loop()
+    pending = set()
+    while True:
+        item = await analyzed.get()
+        if item is None:
+            break
+        # Writes run in the background; the next result is taken right away
+        pending.add(loop.run_in_executor(io_pool, _write, *item))
+    for output_path in await asyncio.gather(*pending):
+        written.append(output_path)
+
+async def run_pipeline_async(input_dir: Path, output_dir: Path, analyzer: PersonaDocumentAnalyzer,
+                             workers: int = 1, prefetch: int = 2, incremental: bool = False) -> List[Path]:
+    """Process every collection folder through read, analyze and write stages running concurrently
+
+    Bounded queues connect the stages: at most prefetch collections are read
+    ahead of the analysis and at most prefetch results wait to be written.
+    With workers > 1, that many collections are analyzed at once in separate
+    processes. Returns the output paths written.
+    """
+    folders = [folder for folder in sorted(input_dir.iterdir()) if folder.is_dir()]
+    loaded = asyncio.Queue(maxsize=prefetch)
+    analyzed = asyncio.Queue(maxsize=prefetch)
+    written = []
+
+    # Collections are the unit of parallelism, so each analysis extracts serially
+    stage_analyzer = copy.copy(analyzer)
+    stage_analyzer.workers = 1
+    consumers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=IO_THREADS) as io_pool, \
+            (ProcessPoolExecutor(max_workers=consumers) if consumers > 1 else ThreadPoolExecutor(max_workers=1)) as cpu_pool:
+        writer = asyncio.ensure_future(_write_stage(io_pool, analyzed, written))
+        await asyncio.gather(
+            _read_stage(folders, output_dir, analyzer, incremental, io_pool, loaded, consumers),
+            *(_analyze_stage(stage_analyzer, cpu_pool, loaded, analyzed) for _ in range(consumers)))
+        await analyzed.put(None)
+        await writer
+    return written
+
+def run_pipeline(input_dir: Path, output_dir: Path, analyzer: PersonaDocumentAnalyzer,
+                 workers: int = 1, prefetch: int = 2, incremental: bool = False) -> List[Path]:
+    """Synchronous entry point for run_pipeline_async"""
+    start = time.perf_counter()
+    written = asyncio.run(run_pipeline_async(input_dir, output_dir, analyzer, workers, prefetch, incremental))
+    logger.info(f"Pipelined {len(written)} collections in {time.perf_counter() - start:.2f}s")
+    return written
@@ -0,0 +1,116 @@
+# Adobe India Hackathon - Connecting the Dots
+# Extractive refinement of top sections for subsection_analysis
+
+import re
+from collections import Counter
+from typing import List, Dict
+
+import numpy as np
+
+from scoring import TermMatrix, bm25_scores, tokenize
+
+TEXT_BUDGET = 500
+MIN_SENTENCE_LENGTH = 20
+# Short lines without closing punctuation after a finished sentence are sub-headings
+MAX_HEADING_LENGTH = 40
+# Weight of redundancy against relevance when picking sentences (maximal marginal relevance)
+REDUNDANCY_WEIGHT = 0.3
+# Term counts are folded into this many buckets for the redundancy comparison
+SIMILARITY_DIM = 256
+
+# Bullet glyphs, including the letter "o" some exporters use for sub-items and
+# the private-use Symbol/Wingdings bullets that Word PDFs extract as
+BULLETS = "•●▪◦‣-–*o\uf0b7\uf0a7"
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'“(\[A-Z0-9])")
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a section's text, with bullets and sub-headings treated as breaks"""
+    sentences = []
+    block = ""
+
+    def flush():
+        nonlocal block
+        if block:
+            sentences.extend(SENTENCE_END.split(block))
+        block = ""
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and line[0] in BULLETS and (len(line) == 1 or line[1] == " "):
+            # A bullet starts a new item, even when its text is on the next line
+            flush()
+            line = line[1:].strip()
+        if not line:
+            continue
+        if (len(line) < MAX_HEADING_LENGTH and not line.endswith((".", ",", ";", "-"))
+                and (not block or block.endswith((".", "!", "?", ":")))):
+            flush()
+            continue
+        if block.endswith("-"):
+            # Rejoin a word hyphenated across lines
+            block += line
+        else:
+            block = f"{block} {line}" if block else line
+    flush()
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+def refine_texts(contents: List[str], query_weights: Dict[str, float], budget: int = TEXT_BUDGET) -> List[str]:
+    """Most relevant, non-redundant sentences of each text that fit the character budget
+
+    Sentences of all texts are scored against the query in one BM25 pass, and
+    each text's sentences are compared with each other through one product of
+    their normalized, hashed term counts. Each text then greedily takes the
+    sentence with the best relevance minus redundancy with what it already
+    took, until nothing else fits. Chosen sentences are returned in reading
+    order.
+    """
+    sentences, owners = [], []
+    for owner, content in enumerate(contents):
+        for sentence in split_sentences(content):
+            if len(sentence) >= MIN_SENTENCE_LENGTH:
+                sentences.append(sentence)
+                owners.append(owner)
+    if not sentences:
+        return ["" for _ in contents]
+
+    matrix = TermMatrix(Counter(tokenize(sentence)) for sentence in sentences)
+    relevance = bm25_scores(matrix, query_weights)
+    if relevance.max() > 0:
+        relevance = relevance / relevance.max()
+
+    vectors = np.zeros((len(sentences), SIMILARITY_DIM))
+    np.add.at(vectors, (matrix.rows, matrix.cols % SIMILARITY_DIM), matrix.counts)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1.0, norms)
+
+    owners = np.array(owners)
+    lengths = np.array([len(sentence) for sentence in sentences])
+    # Sentences are grouped by text, so each text's sentences are one slice
+    bounds = np.searchsorted(owners, np.arange(len(contents) + 1))
+    refined = []
+    for owner in range(len(contents)):
+        first = bounds[owner]
+        similarity = vectors[first:bounds[owner + 1]] @ vectors[first:bounds[owner + 1]].T
+        candidates = np.arange(first, bounds[owner + 1])
+        chosen = []
+        used = 0
+        while len(candidates):
+            # Joining sentences costs one space each
+            fits = candidates[lengths[candidates] + used + (1 if chosen else 0) <= budget]
+            if not len(fits):
+                break
+            redundancy = similarity[np.ix_(fits - first, np.array(chosen) - first)].max(axis=1) if chosen else 0.0
+            gain = relevance[fits] - REDUNDANCY_WEIGHT * redundancy
+            # argmax takes the earliest sentence on ties
+            best = fits[np.argmax(gain)]
+            chosen.append(best)
+            used += lengths[best] + (1 if len(chosen) > 1 else 0)
+            candidates = candidates[candidates != best]
+
+        if not chosen and bounds[owner + 1] > first:
+            # A single sentence longer than the budget is truncated rather than dropped
+            best = first + np.argmax(relevance[first:bounds[owner + 1]])
+            refined.append(sentences[best][:budget])
+        else:
+            refined.append(" ".join(sentences[i] for i in sorted(chosen)))
+    return refined
@@ -0,0 +1,211 @@
+# Adobe India Hackathon - Connecting the Dots
+# Cross-collection scheduler balanced by page count
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+
+import fitz  # PyMuPDF
+
+from main import CollectionJob, PersonaDocumentAnalyzer, SectionCorpus, is_up_to_date, load_collection, write_result
+from section_store import SectionStore
+
+logger = logging.getLogger(__name__)
+
+# Rough resident memory of one extraction: interpreter + PyMuPDF per worker,
+# plus text and sections per page
+WORKER_BASE_MB = 40.0
+PAGE_MB = 0.5
+
+@dataclass
+class CollectionPlan:
+    collection: CollectionJob
+    page_counts: List[int]
+    sections: List[Optional[SectionStore]] = field(default_factory=list)
+    keys: List[Optional[str]] = field(default_factory=list)
+    remaining: int = 0
+    # Documents that could not be opened or extracted
+    failed: Set[int] = field(default_factory=set)
+    manifest: object = None
+    started: Optional[float] = None
+    extract_seconds: float = 0.0
+
+    @property
+    def pages(self) -> int:
+        return sum(self.page_counts)
+
+def estimate_mb(pages: int) -> float:
+    return WORKER_BASE_MB + pages * PAGE_MB
+
+def inventory(input_dir: Path, output_dir: Path) -> List[CollectionPlan]:
+    """Every usable collection with the page count of each PDF, largest collection first"""
+    plans = []
+    for test_case_folder in sorted(input_dir.iterdir()):
+        if not test_case_folder.is_dir():
+            continue
+        collection = load_collection(test_case_folder, output_dir)
+        if collection is None:
+            continue
+        page_counts = []
+        failed = set()
+        for doc_index, pdf in enumerate(collection.pdf_paths):
+            # Opening only reads the xref, so counting pages is cheap
+            try:
+                with fitz.open(pdf) as doc:
+                    page_counts.append(doc.page_count)
+            except Exception as e:
+                logger.error(f"Error opening {pdf}: {str(e)}")
+                page_counts.append(0)
+                failed.add(doc_index)
+        plans.append(CollectionPlan(collection, page_counts, failed=failed))
+    plans.sort(key=lambda plan: plan.pages, reverse=True)
+    return plans
+
+def _timed_extract(analyzer: PersonaDocumentAnalyzer, pdf_path: str) -> Tuple[SectionStore, float]:
+    start = time.perf_counter()
+    sections = analyzer.extract_document_sections(pdf_path)
+    return sections, time.perf_counter() - start
+
+def run_scheduled(input_dir: Path, output_dir: Path, analyzer: PersonaDocumentAnalyzer,
+                  workers: int = 0, memory_budget_mb: float = 400.0,
+                  incremental: bool = False) -> Dict[str, Dict]:
+    """Process every collection with one bounded worker pool shared across collections
+
+    Documents from all collections are queued longest first (by page count),
+    and a new one starts only while the estimated memory of running
+    extractions fits the budget. Each collection is ranked and written as soon
+    as its last document finishes. Returns per-collection timings, which are
+    also written to schedule_report.json in the output directory.
+    """
+    wall_start = time.perf_counter()
+    plans = inventory(input_dir, output_dir)
+    workers = workers or os.cpu_count() or 1
+
+    queue = []
+    for plan_index, plan in enumerate(plans):
+        if incremental:
+            up_to_date, plan.manifest = is_up_to_date(plan.collection, analyzer)
+            if up_to_date:
+                continue
+        plan.sections = [None] * len(plan.page_counts)
+        plan.keys = [None] * len(plan.page_counts)
+        plan.remaining = len(plan.page_counts)
+        for doc_index, pages in enumerate(plan.page_counts):
+            if doc_index in plan.failed:
+                plan.sections[doc_index] = SectionStore()
+                plan.remaining -= 1
+                continue
+            if analyzer.cache is not None:
+                # Cache hits are resolved here and never occupy a worker
+                pdf_path = plan.collection.pdf_paths[doc_index]
+                plan.keys[doc_index] = analyzer.cache.key_for(pdf_path)
+                cached = analyzer.cache.get(plan.keys[doc_index], pdf_path.name)
+                if cached is not None:
+                    plan.sections[doc_index] = cached
+                    plan.remaining -= 1
+                    continue
+            queue.append((pages, plan_index, doc_index))
+    queue.sort(key=lambda item: item[0], reverse=True)
+
+    report = {}
+    for plan in plans:
+        if plan.sections and plan.remaining == 0:
+            plan.started = time.perf_counter()
+            report[plan.collection.name] = _finish(plan, analyzer, wall_start)
+
+    total_pages = sum(pages for pages, _, _ in queue)
+    logger.info(f"Scheduling {len(queue)} documents ({total_pages} pages) from "
+                f"{len(plans)} collections on {workers} workers")
+
+    running = {}
+    in_flight_mb = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while queue or running:
+            # Admit the longest waiting document that fits; the first one always runs
+            while queue and len(running) < workers:
+                fit = next((i for i, (pages, _, _) in enumerate(queue)
+                            if not running or in_flight_mb + estimate_mb(pages) <= memory_budget_mb), None)
+                if fit is None:
+                    break
+                pages, plan_index, doc_index = queue.pop(fit)
+                plan = plans[plan_index]
+                if plan.started is None:
+                    plan.started = time.perf_counter()
+                pdf_path = str(plan.collection.pdf_paths[doc_index])
+                future = pool.submit(_timed_extract, analyzer, pdf_path)
+                running[future] = (plan_index, doc_index, estimate_mb(pages))
+                in_flight_mb += estimate_mb(pages)
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                plan_index, doc_index, mb = running.pop(future)
+                in_flight_mb -= mb
+                plan = plans[plan_index]
+                try:
+                    sections, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Error extracting {plan.collection.pdf_paths[doc_index]}: {str(e)}")
+                    sections, seconds = SectionStore(), 0.0
+                    plan.failed.add(doc_index)
+                else:
+                    if analyzer.cache is not None:
+                        analyzer.cache.put(plan.keys[doc_index], sections)
+                plan.sections[doc_index] = sections
+                plan.extract_seconds += seconds
+                plan.remaining -= 1
+                if plan.remaining == 0:
+                    report[plan.collection.name] = _finish(plan, analyzer, wall_start)
+
+    report_path = output_dir / "schedule_report.json"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({"wall_seconds": round(time.perf_counter() - wall_start, 3),
+                   "workers": workers, "memory_budget_mb": memory_budget_mb,
+                   "collections": report}, f, indent=2)
+    logger.info(f"Finished {len(report)} collections in {time.perf_counter() - wall_start:.2f}s")
+    return report
+
+def _finish(plan: CollectionPlan, analyzer: PersonaDocumentAnalyzer, wall_start: float) -> Dict:
+    """Rank a fully extracted collection and write its output
+
+    Documents that failed are ranked as empty and left out of the manifest,
+    so an incremental run extracts them again. An error here is logged and
+    reported for this collection only.
+    """
+    collection = plan.collection
+    rank_start = time.perf_counter()
+    try:
+        sections = SectionStore.concat(plan.sections)
+        corpus = SectionCorpus(analyzer, [str(pdf) for pdf in collection.pdf_paths], sections)
+        try:
+            write_result(collection, corpus.rank(collection.persona, collection.job))
+        finally:
+            corpus.close()
+        if plan.manifest is not None:
+            for doc_index in plan.failed:
+                plan.manifest.current["pdfs"].pop(collection.pdf_paths[doc_index].name, None)
+            plan.manifest.save()
+    except Exception as e:
+        logger.error(f"Error processing {collection.name}: {str(e)}")
+        return {"documents": len(plan.page_counts), "error": str(e)}
+    finally:
+        plan.sections = []
+
+    finished = time.perf_counter()
+    timings = {
+        "documents": len(plan.page_counts),
+        "failed_documents": sorted(collection.pdf_paths[doc_index].name for doc_index in plan.failed),
+        "pages": plan.pages,
+        "extract_cpu_seconds": round(plan.extract_seconds, 3),
+        "rank_seconds": round(finished - rank_start, 3),
+        "started_at": round(plan.started - wall_start, 3),
+        "finished_at": round(finished - wall_start, 3),
+    }
+    logger.info(f"{collection.name}: {timings['pages']} pages, extract {timings['extract_cpu_seconds']}s, "
+                f"rank {timings['rank_seconds']}s, done at {timings['finished_at']}s")
+    return timings
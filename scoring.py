@@ -0,0 +1,147 @@
+# Adobe India Hackathon - Connecting the Dots
+# Relevance scoring for Round 1B
+
+import copy
+import re
+from collections import Counter
+from typing import Callable, List, Dict, Iterable
+
+import numpy as np
+
+from section_store import Section
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Function words that would otherwise match nearly every section
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that the
+their to was were will with
+""".split())
+
+PERSONA_WEIGHT = 2.0
+JOB_WEIGHT = 3.0
+SECTION_KEYWORD_WEIGHT = 1.0
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens of text"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def section_terms(section: Section) -> Counter:
+    """Term frequencies of a section's content and title"""
+    return Counter(tokenize(section.content + " " + section.section_title))
+
+def length_bonus(section: Section) -> float:
+    """Bonus for longer, more substantial content"""
+    return min(len(section.content) / 1000, 2.0)
+
+class CompiledQuery:
+    """Persona, job and section-type terms with their weights, prepared once per analysis
+
+    The default mode matches whole tokens with hash lookups. With legacy=True
+    every term is matched as a substring of the lowercased text, reproducing
+    the scores of the original keyword scan exactly.
+    """
+
+    def __init__(self, persona: str, job: str, section_keywords: Iterable[str], legacy: bool = False):
+        self.legacy = legacy
+        query_weights = Counter()
+        for keyword in set(tokenize(persona)) - STOPWORDS:
+            query_weights[keyword] += PERSONA_WEIGHT
+        for keyword in set(tokenize(job)) - STOPWORDS:
+            query_weights[keyword] += JOB_WEIGHT
+
+        weights = Counter()
+        if legacy:
+            # Repeated words score once per occurrence, as in the original scan
+            for keyword in persona.lower().split():
+                weights[keyword] += PERSONA_WEIGHT
+            for keyword in job.lower().split():
+                weights[keyword] += JOB_WEIGHT
+            for keyword in section_keywords:
+                weights[keyword] += SECTION_KEYWORD_WEIGHT
+        else:
+            weights.update(query_weights)
+            for keyword in set(section_keywords):
+                weights[keyword] += SECTION_KEYWORD_WEIGHT
+        self.weights = dict(weights)
+        # Persona and job tokens only, used as the query vector by ranking backends
+        self.query_weights = dict(query_weights)
+
+    def weighted(self, informativeness: Callable[[str], float]) -> "CompiledQuery":
+        """Copy whose keyword weights are scaled by each term's informativeness, e.g. its IDF
+
+        query_weights are left as they are, since ranking backends apply
+        their own term statistics.
+        """
+        query = copy.copy(self)
+        query.weights = {keyword: weight * informativeness(keyword) for keyword, weight in self.weights.items()}
+        return query
+
+    def score(self, section: Section) -> float:
+        """Relevance score of a single section"""
+        return self.score_text(section.content + " " + section.section_title) + length_bonus(section)
+
+    def score_text(self, text: str) -> float:
+        """Keyword part of the score for arbitrary text"""
+        if self.legacy:
+            text = text.lower()
+            return sum(weight for keyword, weight in self.weights.items() if keyword in text)
+        return self.score_terms(Counter(tokenize(text)))
+
+    def score_terms(self, terms: Counter) -> float:
+        """Keyword part of the score for an already tokenized section"""
+        return sum(weight for keyword, weight in self.weights.items() if keyword in terms)
+
+class TermMatrix:
+    """Sparse section-by-term count matrix in coordinate form"""
+
+    def __init__(self, term_counts: Iterable[Counter]):
+        vocabulary = {}
+        rows, cols, counts = [], [], []
+        n_sections = 0
+        for row, terms in enumerate(term_counts):
+            for term, count in terms.items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+            n_sections = row + 1
+
+        self.vocabulary = vocabulary
+        self.n_sections = n_sections
+        self.rows = np.array(rows, dtype=np.int64)
+        self.cols = np.array(cols, dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.float64)
+        self.lengths = np.bincount(self.rows, weights=self.counts, minlength=self.n_sections)
+        self.document_frequency = np.bincount(self.cols, minlength=len(vocabulary))
+
+    def query_vector(self, query_weights: Dict[str, float]) -> np.ndarray:
+        """Dense weight vector over the vocabulary; terms not in the corpus are dropped"""
+        vector = np.zeros(len(self.vocabulary))
+        for term, weight in query_weights.items():
+            col = self.vocabulary.get(term)
+            if col is not None:
+                vector[col] = weight
+        return vector
+
+def keyword_scores(matrix: TermMatrix, weights: Dict[str, float]) -> np.ndarray:
+    """CompiledQuery.score_terms for every section: each matching term counts once"""
+    contributions = matrix.query_vector(weights)[matrix.cols]
+    return np.bincount(matrix.rows, weights=contributions, minlength=matrix.n_sections)
+
+def bm25_scores(matrix: TermMatrix, query_weights: Dict[str, float],
+                k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """BM25 score of every section for a weighted query, in one vectorized pass"""
+    if matrix.n_sections == 0:
+        return np.zeros(0)
+
+    query = matrix.query_vector(query_weights)
+    n = matrix.n_sections
+    df = matrix.document_frequency
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    average_length = max(matrix.lengths.mean(), 1.0)
+
+    # Only non-zero entries are touched; each contributes to its section's row sum
+    tf = matrix.counts
+    norm = k1 * (1 - b + b * matrix.lengths[matrix.rows] / average_length)
+    contributions = query[matrix.cols] * idf[matrix.cols] * tf * (k1 + 1) / (tf + norm)
+    return np.bincount(matrix.rows, weights=contributions, minlength=n)
@@ -0,0 +1,147 @@
+# Adobe India Hackathon - Connecting the Dots
+# Persistent content-addressed cache for extracted PDF sections
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+import logging
+from typing import Optional
+
+from section_store import SectionStore
+
+logger = logging.getLogger(__name__)
+
+# Entry layout (zlib-compressed):
+#   header:  magic, text count, section count
+#   text:    byte length, UTF-8 text (one per page with sections)
+#   section: text index, page number, title start, title end, content end
+#            (character offsets into the text)
+_MAGIC = b"SEC2"
+_HEADER = struct.Struct("<4sII")
+_TEXT = struct.Struct("<I")
+_SECTION = struct.Struct("<IIIII")
+_SUFFIX = ".sec"
+
+def encode_sections(store: SectionStore) -> bytes:
+    """Pack one document's section store into the compact binary cache format"""
+    parts = [_HEADER.pack(_MAGIC, len(store.texts), len(store))]
+    for text in store.texts:
+        encoded = text.encode("utf-8", "surrogatepass")
+        parts.append(_TEXT.pack(len(encoded)))
+        parts.append(encoded)
+    for fields in zip(store.text_ids, store.page_numbers, store.starts, store.title_ends, store.ends):
+        parts.append(_SECTION.pack(*fields))
+    return zlib.compress(b"".join(parts))
+
+def decode_sections(blob: bytes, document: str) -> SectionStore:
+    """Unpack a cache entry, attaching the document name it was loaded for"""
+    data = zlib.decompress(blob)
+    magic, text_count, count = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC:
+        raise ValueError("Not a section cache entry")
+
+    offset = _HEADER.size
+    texts = []
+    for _ in range(text_count):
+        (length,) = _TEXT.unpack_from(data, offset)
+        offset += _TEXT.size
+        texts.append(data[offset:offset + length].decode("utf-8", "surrogatepass"))
+        offset += length
+
+    spans = [[] for _ in texts]
+    page_numbers = [0] * text_count
+    for _ in range(count):
+        text_id, page_number, start, title_end, end = _SECTION.unpack_from(data, offset)
+        offset += _SECTION.size
+        spans[text_id].append((start, title_end, end))
+        page_numbers[text_id] = page_number
+
+    store = SectionStore()
+    for text, page_number, text_spans in zip(texts, page_numbers, spans):
+        store.add_text(document, page_number, text, text_spans)
+    return store
+
+class SectionCache:
+    """On-disk cache of extracted sections keyed by PDF content and extractor version"""
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, version: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        os.makedirs(directory, exist_ok=True)
+
+    def key_for(self, pdf_path: str, data: Optional[bytes] = None) -> str:
+        """Hash the PDF bytes together with the extractor version
+
+        data, when given, is the PDF's content already in memory, and the file
+        is not read.
+        """
+        # The entry format is part of the key, so older entries are simply never looked up
+        digest = hashlib.sha256(_MAGIC + self.version.encode("utf-8") + b"\0")
+        if data is not None:
+            digest.update(data)
+            return digest.hexdigest()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str, document: str) -> Optional[SectionStore]:
+        """Return cached sections for key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            sections = decode_sections(blob, document)
+        except FileNotFoundError:
+            return None
+        except (ValueError, zlib.error, struct.error) as e:
+            logger.warning(f"Discarding corrupt cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+        # The file mtime doubles as the last-used time for LRU eviction
+        os.utime(path)
+        return sections
+
+    def put(self, key: str, sections: SectionStore):
+        """Store sections under key, then evict old entries past the size cap"""
+        blob = encode_sections(sections)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        # Oldest first
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
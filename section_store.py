@@ -0,0 +1,269 @@
+# Adobe India Hackathon - Connecting the Dots
+# Compact columnar storage for extracted sections
+
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Dict, Iterable, Iterator, Tuple
+
+# Paragraphs at most this long are not meaningful content
+MIN_CONTENT_LENGTH = 50
+# First lines at least this long are body text rather than a title
+MAX_TITLE_LENGTH = 100
+# Lines set this much larger than the page's body text are headings
+HEADING_SIZE_RATIO = 1.15
+# PyMuPDF's span flag for bold text
+_BOLD = 16
+
+@dataclass
+class Section:
+    document: str
+    page_number: int
+    section_title: str
+    importance_rank: int
+    content: str = ""
+
+def page_section_spans(text: str) -> Iterator[Tuple[int, int, int]]:
+    """(start, title end, end) offsets of the candidate sections in one page's text
+
+    A candidate is a blank-line separated paragraph longer than 50 characters
+    whose first line is shorter than 100 characters and is followed by more
+    text. The title is the first line and the content the whole paragraph,
+    both with surrounding whitespace removed.
+    """
+    start = 0
+    for paragraph in text.split('\n\n'):
+        stripped = paragraph.strip()
+        if len(stripped) > MIN_CONTENT_LENGTH and '\n' in stripped:
+            title_length = len(stripped[:stripped.index('\n')].rstrip())
+            if title_length < MAX_TITLE_LENGTH:
+                section_start = start + len(paragraph) - len(paragraph.lstrip())
+                yield section_start, section_start + title_length, section_start + len(stripped)
+        start += len(paragraph) + 2
+
+def _is_heading(text: str, size: float, bold: bool, body_size: float, body_bold: bool) -> bool:
+    if len(text) >= MAX_TITLE_LENGTH or sum(ch.isalpha() for ch in text) < 3 or text.endswith("."):
+        return False
+    if size >= body_size * HEADING_SIZE_RATIO:
+        return True
+    # Bold labels such as "Ingredients:" introduce a list inside a section
+    return bold and not body_bold and size >= body_size * 0.95 and not text.endswith(":")
+
+def block_section_spans(page_dict: Dict) -> Tuple[str, List[Tuple[int, int, int]]]:
+    """A page's text rebuilt from its PyMuPDF text dict, and the candidate sections in it
+
+    Lines are joined by newlines and blocks by blank lines. A section starts
+    at a heading line, one set larger than the page's body text or in bold
+    where the body is not, and runs to the next heading. A heading wrapped
+    onto further lines of its block stays one heading, and so do headings
+    with no body text between them. Each block before the first heading, or
+    of a page without headings, is a candidate of its own.
+    Titles are a candidate's first line with letters or digits.
+    """
+    parts = []
+    # (start, end, size, bold, block) per line; offsets into the page text
+    lines = []
+    block_starts = []
+    size_chars = Counter()
+    bold_chars = total_chars = 0
+    offset = 0
+    for block_number, block in enumerate(page_dict["blocks"]):
+        if block.get("type", 0) != 0:
+            continue
+        if parts:
+            parts.append("\n\n")
+            offset += 2
+        block_starts.append(offset)
+        for line_number, line in enumerate(block["lines"]):
+            if line_number:
+                parts.append("\n")
+                offset += 1
+            text = "".join(span["text"] for span in line["spans"])
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if spans:
+                bold = all(span["flags"] & _BOLD for span in spans)
+                for span in spans:
+                    size_chars[round(span["size"], 1)] += len(span["text"])
+                    total_chars += len(span["text"])
+                    bold_chars += len(span["text"]) if span["flags"] & _BOLD else 0
+                lines.append((offset, offset + len(text), round(max(span["size"] for span in spans), 1),
+                              bold, block_number))
+            parts.append(text)
+            offset += len(text)
+    text = "".join(parts)
+    if not lines:
+        return text, []
+
+    body_size = size_chars.most_common(1)[0][0]
+    body_bold = bold_chars * 2 > total_chars
+    cuts = []
+    previous = None
+    # Whether body text followed the last cut; a heading right below another,
+    # such as a page title above "Introduction", stays in the upper section
+    body_since_cut = True
+    for start, end, size, bold, block_number in lines:
+        heading = _is_heading(text[start:end].strip(), size, bold, body_size, body_bold)
+        # Further lines of a wrapped heading continue it rather than starting a section
+        if heading and not (previous is not None and previous[0] and previous[1:] == (size, bold, block_number)):
+            if body_since_cut:
+                cuts.append(start)
+            body_since_cut = False
+        elif not heading:
+            body_since_cut = True
+        previous = (heading, size, bold, block_number)
+
+    # Text before the first heading has no title of its own, so each block is a candidate
+    first_cut = cuts[0] if cuts else len(text)
+    bounds = [start for start in block_starts if start < first_cut] + cuts + [len(text)]
+    spans = []
+    for start, end in zip(bounds, bounds[1:]):
+        span = _segment_span(text, start, end)
+        if span is not None:
+            spans.append(span)
+    return text, spans
+
+def _segment_span(text: str, start: int, end: int):
+    """(start, title end, end) of a segment, titled by its first line with letters or digits"""
+    while start < end:
+        line_end = text.find('\n', start, end)
+        if line_end < 0:
+            return None
+        if any(ch.isalnum() for ch in text[start:line_end]):
+            break
+        # Lone bullet glyphs are set on a line of their own
+        start = line_end + 1
+    segment = text[start:end]
+    stripped = segment.strip()
+    if len(stripped) <= MIN_CONTENT_LENGTH or '\n' not in stripped:
+        return None
+    section_start = start + len(segment) - len(segment.lstrip())
+    title_length = len(stripped[:stripped.index('\n')].rstrip())
+    return section_start, section_start + title_length, section_start + len(stripped)
+
+class SectionStore:
+    """Extracted sections held column-wise instead of as one object per section
+
+    Document names are interned, per-section fields live in typed arrays, and
+    titles and contents are offsets into one text buffer per page, so a
+    section costs a few dozen bytes on top of its page's text. Section objects
+    are only materialized when iterating or indexing.
+    """
+
+    def __init__(self):
+        self.documents: List[str] = []
+        self._document_ids: Dict[str, int] = {}
+        self.texts: List[str] = []
+        self.document_ids = array("I")
+        self.page_numbers = array("I")
+        self.text_ids = array("I")
+        self.starts = array("I")
+        self.title_ends = array("I")
+        self.ends = array("I")
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> Section:
+        return Section(
+            document=self.documents[self.document_ids[index]],
+            page_number=self.page_numbers[index],
+            section_title=self.title(index),
+            importance_rank=0,
+            content=self.content(index)
+        )
+
+    def __iter__(self) -> Iterator[Section]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def title(self, index: int) -> str:
+        return self.texts[self.text_ids[index]][self.starts[index]:self.title_ends[index]]
+
+    def content(self, index: int) -> str:
+        return self.texts[self.text_ids[index]][self.starts[index]:self.ends[index]]
+
+    def content_lengths(self) -> List[int]:
+        return [end - start for start, end in zip(self.starts, self.ends)]
+
+    def _intern(self, document: str) -> int:
+        document_id = self._document_ids.get(document)
+        if document_id is None:
+            document_id = self._document_ids[document] = len(self.documents)
+            self.documents.append(document)
+        return document_id
+
+    def add_text(self, document: str, page_number: int, text: str,
+                 spans: Iterable[Tuple[int, int, int]]) -> int:
+        """Add sections given as (start, title end, end) offsets into text; returns how many"""
+        spans = list(spans)
+        if not spans:
+            return 0
+
+        # Only keep the part of the text that some section refers to
+        first = min(start for start, _, _ in spans)
+        last = max(end for _, _, end in spans)
+        text_id = len(self.texts)
+        self.texts.append(text[first:last] if first or last < len(text) else text)
+        document_id = self._intern(document)
+        for start, title_end, end in spans:
+            self.document_ids.append(document_id)
+            self.page_numbers.append(page_number)
+            self.text_ids.append(text_id)
+            self.starts.append(start - first)
+            self.title_ends.append(title_end - first)
+            self.ends.append(end - first)
+        return len(spans)
+
+    def add_page(self, document: str, page_number: int, text: str) -> int:
+        """Split one page's text into candidate sections; returns how many were added"""
+        return self.add_text(document, page_number, text, page_section_spans(text))
+
+    def add_section(self, section: Section):
+        """Add a section that was materialized elsewhere; its title must start its content"""
+        content = section.content
+        if not content.startswith(section.section_title):
+            raise ValueError(f"Title of a section on page {section.page_number} of "
+                             f"{section.document} does not start its content")
+        self.add_text(section.document, section.page_number, content,
+                      [(0, len(section.section_title), len(content))])
+
+    def extend(self, other: "SectionStore"):
+        """Append every section of another store, keeping their order"""
+        document_map = [self._intern(document) for document in other.documents]
+        text_offset = len(self.texts)
+        self.texts.extend(other.texts)
+        self.document_ids.extend(document_map[document_id] for document_id in other.document_ids)
+        self.page_numbers.extend(other.page_numbers)
+        self.text_ids.extend(text_id + text_offset for text_id in other.text_ids)
+        self.starts.extend(other.starts)
+        self.title_ends.extend(other.title_ends)
+        self.ends.extend(other.ends)
+
+    def subset(self, indices: Iterable[int]) -> "SectionStore":
+        """A store of the given sections, in the given order, sharing this store's texts"""
+        subset = SectionStore()
+        subset.documents = list(self.documents)
+        subset._document_ids = dict(self._document_ids)
+        subset.texts = self.texts
+        for index in indices:
+            subset.document_ids.append(self.document_ids[index])
+            subset.page_numbers.append(self.page_numbers[index])
+            subset.text_ids.append(self.text_ids[index])
+            subset.starts.append(self.starts[index])
+            subset.title_ends.append(self.title_ends[index])
+            subset.ends.append(self.ends[index])
+        return subset
+
+    @classmethod
+    def concat(cls, stores: Iterable["SectionStore"]) -> "SectionStore":
+        combined = cls()
+        for store in stores:
+            combined.extend(store)
+        return combined
+
+    @classmethod
+    def from_sections(cls, sections: Iterable[Section]) -> "SectionStore":
+        store = cls()
+        for section in sections:
+            store.add_section(section)
+        return store
@@ -0,0 +1,235 @@
+# Adobe India Hackathon - Connecting the Dots
+# Long-running query server with warm in-memory collections
+
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from dedup import DEFAULT_SIMILARITY
+from main import RANKERS, SEGMENTATIONS, PersonaDocumentAnalyzer, SectionCorpus, extractor_version, read_query
+from section_cache import SectionCache
+from vector_index import DEFAULT_DIM
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class CollectionRegistry:
+    """Extracted corpora for every collection under an input directory, kept in memory
+
+    A collection is reloaded when any of its PDFs is added, removed or modified.
+    """
+
+    def __init__(self, input_dir: Path, analyzer: PersonaDocumentAnalyzer):
+        self.input_dir = input_dir
+        self.analyzer = analyzer
+        self._corpora: Dict[str, Tuple[tuple, SectionCorpus]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def names(self):
+        return sorted(entry.name for entry in self.input_dir.iterdir()
+                      if (entry / "PDFs").is_dir())
+
+    def _fingerprint(self, pdf_dir: Path) -> tuple:
+        # Stat calls only, so checking freshness on every query stays cheap
+        fingerprint = []
+        with os.scandir(pdf_dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".pdf"):
+                    stat = entry.stat()
+                    fingerprint.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(fingerprint))
+
+    def get(self, name: str) -> SectionCorpus:
+        """Corpus for a collection, (re)building it if its PDFs changed"""
+        pdf_dir = self.input_dir / name / "PDFs"
+        if "/" in name or name.startswith(".") or not pdf_dir.is_dir():
+            raise KeyError(name)
+
+        with self._registry_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        # Queries for other collections proceed while this one rebuilds
+        with lock:
+            fingerprint = self._fingerprint(pdf_dir)
+            cached = self._corpora.get(name)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+
+            start = time.perf_counter()
+            paths = [str(pdf_dir / filename) for filename, _, _ in fingerprint]
+            corpus = self.analyzer.build_corpus(paths)
+            self._corpora[name] = (fingerprint, corpus)
+            action = "Reloaded" if cached is not None else "Loaded"
+            logger.info(f"{action} {name}: {len(corpus.sections)} sections from "
+                        f"{len(paths)} PDFs in {time.perf_counter() - start:.2f}s")
+            return corpus
+
+    def default_query(self, name: str) -> Tuple[str, str]:
+        """Persona and job from the collection's input JSON, if it has one"""
+        for metadata_path in sorted((self.input_dir / name).glob("*input.json")):
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                return read_query(json.load(f))
+        return "", ""
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """JSON API:
+
+    GET  /health               liveness check
+    GET  /collections          available collections
+    POST /query                {"collection": ..., "persona": ..., "job": ...}
+    """
+
+    registry: CollectionRegistry = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/collections":
+            self._send(200, {"collections": self.registry.names()})
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/query":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            self._send(400, {"error": "Request body must be JSON"})
+            return
+
+        if not isinstance(request, dict):
+            self._send(400, {"error": "Request body must be a JSON object"})
+            return
+        name = request.get("collection", "")
+        persona, job = read_query(request)
+        if not isinstance(name, str):
+            self._send(400, {"error": "'collection' must be a string"})
+            return
+        if not isinstance(persona, str) or not isinstance(job, str):
+            self._send(400, {"error": "Persona and job must be strings"})
+            return
+        try:
+            corpus = self.registry.get(name)
+        except KeyError:
+            self._send(404, {"error": f"Unknown collection '{name}'"})
+            return
+
+        if not persona or not job:
+            default_persona, default_job = self.registry.default_query(name)
+            persona, job = persona or default_persona, job or default_job
+        if not persona or not job:
+            self._send(400, {"error": "Missing persona or job"})
+            return
+
+        try:
+            result = corpus.rank(persona, job)
+        except Exception as e:
+            logger.error(f"Error ranking {name}: {str(e)}")
+            self._send(500, {"error": f"Error ranking {name}: {str(e)}"})
+            return
+        self._send(200, result)
+
+    def _send(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket peers have no host address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} {format % args}")
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+def make_server(registry: CollectionRegistry, host: str = "127.0.0.1", port: int = 8080,
+                socket_path: Optional[str] = None):
+    """HTTP server on a localhost port, or on a Unix socket when socket_path is given"""
+    handler = type("BoundQueryHandler", (QueryHandler,), {"registry": registry})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Round 1B queries from warm in-memory collections")
+    parser.add_argument("--input-dir", default="/app/input", help="directory of collection folders")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--socket", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used for PDF extraction (0 = one per CPU)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="directory for the persistent extracted-section cache")
+    # Options that shape the extracted corpus or its ranking apply to every
+    # query; per-run options such as --deadline, --two-phase, --low-memory
+    # and --score-workers are not offered
+    parser.add_argument("--ranker", choices=RANKERS, default="heuristic")
+    parser.add_argument("--legacy-scoring", action="store_true",
+                        help="score with the original substring matching")
+    parser.add_argument("--segmentation", choices=SEGMENTATIONS, default="paragraphs",
+                        help="cut sections at blank lines of the plain text, or at headings and text blocks")
+    parser.add_argument("--index-dim", type=int, default=DEFAULT_DIM,
+                        help="hashed feature dimensions per section for --ranker vector")
+    parser.add_argument("--index-partition", action="store_true",
+                        help="partition indexes of 4096+ sections by k-means for faster, approximate "
+                             "--ranker vector search (default: exact)")
+    parser.add_argument("--dedup", type=float, nargs="?", const=DEFAULT_SIMILARITY, default=0.0, metavar="SIMILARITY",
+                        help="rank only the first of sections whose estimated Jaccard similarity "
+                             f"reaches SIMILARITY, between 0 and 1 (default {DEFAULT_SIMILARITY} when given)")
+    parser.add_argument("--refine", action="store_true",
+                        help="fill subsection_analysis with the most relevant non-redundant sentences")
+    parser.add_argument("--term-weighting", action="store_true",
+                        help="scale keyword weights by their rarity in the collection (heuristic ranker)")
+    parser.add_argument("--stats-dir", default=None,
+                        help="where --term-weighting keeps per-collection term statistics (default: in memory)")
+    parser.add_argument("--preload", action="store_true", help="extract every collection at startup")
+    args = parser.parse_args(argv)
+
+    cache = SectionCache(args.cache_dir, version=extractor_version(args.segmentation)) if args.cache_dir else None
+    try:
+        analyzer = PersonaDocumentAnalyzer(workers=args.workers, cache=cache, ranker=args.ranker,
+                                           legacy_scoring=args.legacy_scoring, segmentation=args.segmentation,
+                                           index_dim=args.index_dim, index_partition=args.index_partition,
+                                           dedup=args.dedup, refine=args.refine,
+                                           term_weighting=args.term_weighting, stats_dir=args.stats_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    registry = CollectionRegistry(Path(args.input_dir), analyzer)
+    if args.preload:
+        for name in registry.names():
+            registry.get(name)
+
+    server = make_server(registry, args.host, args.port, args.socket)
+    logger.info(f"Serving {args.input_dir} on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Adobe India Hackathon - Connecting the Dots
+# Cross-collection search with one shard per collection
+
+import copy
+import heapq
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+from main import PersonaDocumentAnalyzer, read_query
+from section_store import Section
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Shard:
+    """One collection folder, searched and indexed on its own"""
+    name: str
+    pdf_paths: List[str]
+
+def discover_shards(input_dir: Path) -> List[Shard]:
+    """Every collection folder under input_dir with PDFs, in name order"""
+    shards = []
+    for folder in sorted(input_dir.iterdir()):
+        pdf_paths = sorted(str(pdf) for pdf in (folder / "PDFs").glob("*.pdf")) if folder.is_dir() else []
+        if pdf_paths:
+            shards.append(Shard(folder.name, pdf_paths))
+    return shards
+
+def search_shard(analyzer: PersonaDocumentAnalyzer, shard: Shard, persona: str, job: str) -> List[Tuple[float, Section]]:
+    """A shard's top (score, section) pairs, best first
+
+    The shard's index is its cached sections, so only a shard that is new
+    or changed is extracted again.
+    """
+    corpus = analyzer.build_corpus(shard.pdf_paths)
+    try:
+        return corpus.search(persona, job)
+    finally:
+        corpus.close()
+
+def search_collections(shards: List[Shard], analyzer: PersonaDocumentAnalyzer, persona: str, job: str,
+                       workers: int = 1) -> Dict:
+    """Round 1B output ranking sections across every shard, with each entry's collection
+
+    Shards are searched in parallel, each returning only its top_k, and the
+    per-shard lists are merged with a heap. Equal scores keep shard order.
+    """
+    if analyzer.ranker != "heuristic" or analyzer.term_weighting:
+        # BM25, the vector index's TF-IDF cosine and term weighting all use the
+        # statistics of one collection, so scores from different shards disagree
+        raise ValueError("Cross-collection search needs scores that do not depend on the collection; "
+                         "use the heuristic ranker without term weighting")
+
+    start = time.perf_counter()
+    if min(workers, len(shards)) > 1:
+        # Each shard gets one process; nested extraction pools are not needed
+        shard_analyzer = copy.copy(analyzer)
+        shard_analyzer.workers = 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            futures = [pool.submit(search_shard, shard_analyzer, shard, persona, job) for shard in shards]
+            results = [future.result() for future in futures]
+    else:
+        results = [search_shard(analyzer, shard, persona, job) for shard in shards]
+
+    merged = heapq.merge(*[[(score, shard.name, section) for score, section in hits]
+                           for shard, hits in zip(shards, results)],
+                         key=lambda hit: -hit[0])
+    top = list(islice(merged, analyzer.top_k))
+    logger.info(f"Searched {len(shards)} collections in {time.perf_counter() - start:.2f}s")
+
+    result = analyzer.build_result([path for shard in shards for path in shard.pdf_paths], persona, job,
+                                   [section for _, _, section in top],
+                                   collections=[name for _, name, _ in top])
+    result["metadata"]["collections"] = [shard.name for shard in shards]
+    return result
+
+def run_search(input_dir: Path, query_path: Path, output_path: Path, analyzer: PersonaDocumentAnalyzer,
+               workers: int = 1) -> Dict:
+    """Search every collection under input_dir for the persona and job in a query JSON, writing one output"""
+    with open(query_path, 'r', encoding='utf-8') as f:
+        persona, job = read_query(json.load(f))
+    if not persona or not job:
+        raise ValueError(f"Missing persona or job in {query_path}")
+
+    shards = discover_shards(input_dir)
+    result = search_collections(shards, analyzer, persona, job, workers)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    logger.info(f"Saved cross-collection results to {output_path}")
+    return result
@@ -0,0 +1,150 @@
+# Adobe India Hackathon - Connecting the Dots
+# Shared-memory section corpus for multi-process scoring
+
+import heapq
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from scoring import CompiledQuery
+from section_store import Section, SectionStore
+
+logger = logging.getLogger(__name__)
+
+# Slices per worker, so a slow slice does not hold up the merge
+SLICES_PER_WORKER = 4
+
+def _aligned(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+def _column_layout(n: int, text_bytes: int) -> List[Tuple[str, type, int, int]]:
+    """(name, dtype, offset, length) of each array in the shared block"""
+    layout = []
+    offset = 0
+    for name, dtype, length in (("offsets", np.int64, n + 1), ("title_lengths", np.uint32, n),
+                                ("document_ids", np.uint32, n), ("page_numbers", np.uint32, n),
+                                ("texts", np.uint8, text_bytes)):
+        layout.append((name, dtype, offset, length))
+        offset += _aligned(length * np.dtype(dtype).itemsize)
+    return layout
+
+class SharedCorpus:
+    """Sections laid out once in a single shared memory block
+
+    Each section's content is stored as UTF-8 in one flat byte buffer, with
+    byte offsets, title lengths, document ids and page numbers in typed arrays
+    beside it. Other processes attach by name through a small picklable
+    layout and read the arrays in place, without copying or unpickling the
+    corpus.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, layout: Dict, owner: bool):
+        self.memory = memory
+        self.layout = layout
+        self.owner = owner
+        self.documents = layout["documents"]
+        for name, dtype, offset, length in _column_layout(layout["sections"], layout["text_bytes"]):
+            setattr(self, name, np.ndarray((length,), dtype=dtype, buffer=memory.buf, offset=offset))
+
+    def __len__(self) -> int:
+        return self.layout["sections"]
+
+    def __enter__(self) -> "SharedCorpus":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @classmethod
+    def create(cls, store: SectionStore) -> "SharedCorpus":
+        """Copy a section store into a new shared memory block"""
+        encoded = [store.content(i).encode("utf-8", "surrogatepass") for i in range(len(store))]
+        title_lengths = [len(store.title(i).encode("utf-8", "surrogatepass")) for i in range(len(store))]
+        text_bytes = sum(len(content) for content in encoded)
+        columns = _column_layout(len(store), text_bytes)
+        _, dtype, offset, length = columns[-1]
+        memory = shared_memory.SharedMemory(create=True, size=max(offset + length, 1))
+        layout = {"name": memory.name, "sections": len(store), "text_bytes": text_bytes,
+                  "documents": list(store.documents)}
+        corpus = cls(memory, layout, owner=True)
+        corpus.offsets[0] = 0
+        np.cumsum([len(content) for content in encoded], out=corpus.offsets[1:])
+        corpus.title_lengths[:] = title_lengths
+        corpus.document_ids[:] = store.document_ids
+        corpus.page_numbers[:] = store.page_numbers
+        corpus.texts[:] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return corpus
+
+    @classmethod
+    def attach(cls, layout: Dict) -> "SharedCorpus":
+        """Open a block created by another process, without taking ownership of it"""
+        # Pool workers share the creator's resource tracker, so registering
+        # the block again is harmless and the creator's unlink settles it
+        return cls(shared_memory.SharedMemory(name=layout["name"]), layout, owner=False)
+
+    def section(self, index: int) -> Section:
+        encoded = self.texts[self.offsets[index]:self.offsets[index + 1]].tobytes()
+        content = encoded.decode("utf-8", "surrogatepass")
+        title = encoded[:self.title_lengths[index]].decode("utf-8", "surrogatepass")
+        return Section(
+            document=self.documents[self.document_ids[index]],
+            page_number=int(self.page_numbers[index]),
+            section_title=title,
+            importance_rank=0,
+            content=content
+        )
+
+    def close(self):
+        """Detach the arrays and the block, and free it if this process created it"""
+        for name, _, _, _ in _column_layout(0, 0):
+            setattr(self, name, None)
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+_worker_corpus: Optional[SharedCorpus] = None
+
+def _attach_worker(layout: Dict):
+    global _worker_corpus
+    _worker_corpus = SharedCorpus.attach(layout)
+
+def _score_slice(query: CompiledQuery, start: int, stop: int, k: int) -> List[Tuple[float, int]]:
+    """The k best (score, index) pairs of one slice, scored in a worker"""
+    scored = ((query.score(_worker_corpus.section(i)), -i) for i in range(start, stop))
+    return [(score, -negated) for score, negated in heapq.nlargest(k, scored)]
+
+class SharedScorer:
+    """Ranks one shared corpus for any number of queries with a pool of worker processes
+
+    Workers attach to the corpus once when they start, so a query sends only
+    the compiled query and slice bounds, and each slice returns only its k
+    best (score, index) pairs for the global merge.
+    """
+
+    def __init__(self, store: SectionStore, workers: int):
+        self.corpus = SharedCorpus.create(store)
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                                        initargs=(self.corpus.layout,))
+
+    def __enter__(self) -> "SharedScorer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def top_k(self, query: CompiledQuery, k: int) -> List[Tuple[float, int]]:
+        """(score, index) of the k best sections, best first; equal scores keep corpus order"""
+        n = len(self.corpus)
+        step = max(1, -(-n // (self.workers * SLICES_PER_WORKER)))
+        futures = [self.pool.submit(_score_slice, query, start, min(n, start + step), k)
+                   for start in range(0, n, step)]
+        pairs = [pair for future in futures for pair in future.result()]
+        return heapq.nlargest(k, pairs, key=lambda pair: (pair[0], -pair[1]))
+
+    def close(self):
+        self.pool.shutdown()
+        self.corpus.close()
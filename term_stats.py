@@ -0,0 +1,129 @@
+# Adobe India Hackathon - Connecting the Dots
+# Per-collection term statistics for informativeness weighting
+
+import json
+import logging
+import math
+import os
+import tempfile
+from collections import Counter
+from typing import List, Dict, Optional
+
+from scoring import section_terms
+from section_store import SectionStore
+
+logger = logging.getLogger(__name__)
+
+STATS_FORMAT = 1
+
+def pdf_fingerprint(pdf_path: str) -> List[int]:
+    """Size and modification time, enough to notice a replaced or edited PDF"""
+    stat = os.stat(pdf_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+class TermStatistics:
+    """Document frequency, collection frequency and section lengths of one collection
+
+    Frequencies count sections, the units that are ranked. Each PDF's counts
+    are kept beside the collection totals, so adding, changing or removing a
+    PDF only adds or subtracts that PDF's counts.
+    """
+
+    def __init__(self, version: str = ""):
+        self.version = version
+        # name -> fingerprint, section count, token count, df and cf of one PDF
+        self.documents: Dict[str, Dict] = {}
+        self.n_sections = 0
+        self.total_length = 0
+        self.df = Counter()
+        self.cf = Counter()
+        # Set when counts were added or removed since loading
+        self.changed = False
+
+    @property
+    def average_length(self) -> float:
+        """Mean tokens per section"""
+        return self.total_length / self.n_sections if self.n_sections else 0.0
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency; 1.0 for a term in every section"""
+        return math.log((1 + self.n_sections) / (1 + self.df.get(term, 0))) + 1.0
+
+    def stale(self, pdf_paths: List[str]) -> List[str]:
+        """Drop PDFs that were removed from the collection, then list those missing or changed"""
+        names = {os.path.basename(path) for path in pdf_paths}
+        for name in [name for name in self.documents if name not in names]:
+            self.remove(name)
+        return [path for path in pdf_paths
+                if self.documents.get(os.path.basename(path), {}).get("fingerprint") != pdf_fingerprint(path)]
+
+    def add(self, pdf_path: str, store: SectionStore):
+        """Count one PDF's sections, replacing any earlier counts for it"""
+        name = os.path.basename(pdf_path)
+        self.remove(name)
+        df, cf = Counter(), Counter()
+        length = 0
+        for section in store:
+            terms = section_terms(section)
+            df.update(terms.keys())
+            cf.update(terms)
+            length += sum(terms.values())
+        self.documents[name] = {"fingerprint": pdf_fingerprint(pdf_path), "sections": len(store),
+                                "length": length, "df": dict(df), "cf": dict(cf)}
+        self.n_sections += len(store)
+        self.total_length += length
+        self.df.update(df)
+        self.cf.update(cf)
+        self.changed = True
+
+    def remove(self, name: str):
+        """Subtract a PDF's counts from the totals"""
+        counts = self.documents.pop(name, None)
+        if counts is None:
+            return
+        self.n_sections -= counts["sections"]
+        self.total_length -= counts["length"]
+        # Counter subtraction drops terms whose count reaches zero
+        self.df.subtract(counts["df"])
+        self.cf.subtract(counts["cf"])
+        self.df = +self.df
+        self.cf = +self.cf
+        self.changed = True
+
+    def save(self, path: str):
+        """Write the statistics atomically as JSON"""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"format": STATS_FORMAT, "version": self.version, "n_sections": self.n_sections,
+                           "total_length": self.total_length, "df": self.df, "cf": self.cf,
+                           "documents": self.documents}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: Optional[str], version: str = "") -> "TermStatistics":
+        """Read saved statistics, or start empty if they are missing or from another extractor"""
+        stats = cls(version)
+        if path is None:
+            return stats
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return stats
+        except json.JSONDecodeError:
+            logger.warning(f"Discarding corrupt term statistics {path}")
+            return stats
+        if data.get("format") != STATS_FORMAT or data.get("version") != version:
+            return stats
+        stats.documents = data["documents"]
+        stats.n_sections = data["n_sections"]
+        stats.total_length = data["total_length"]
+        stats.df = Counter(data["df"])
+        stats.cf = Counter(data["cf"])
+        return stats
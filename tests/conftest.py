@@ -0,0 +1,24 @@
+# Adobe India Hackathon - Connecting the Dots
+# Shared pytest setup: imports from the repository root and generated PDFs
+
+import os
+import sys
+
+import fitz
+import pytest
+
+# The modules under test live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def make_pdf():
+    """Factory writing a PDF with one page per given text"""
+    def make(path, pages):
+        doc = fitz.open()
+        for text in pages:
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(72, 72, 540, 770), text, fontsize=10)
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+    return make
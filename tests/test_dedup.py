@@ -0,0 +1,52 @@
+# Adobe India Hackathon - Connecting the Dots
+# Tests for MinHash near-duplicate collapsing
+
+import pytest
+
+from dedup import duplicate_representatives
+from main import PersonaDocumentAnalyzer
+from section_store import Section, SectionStore
+
+BODY = ("The old town walking tour starts at the cathedral square, follows the river past "
+        "the covered market and the medieval bridge, and ends at the castle gardens at sunset.")
+NEAR_BODY = BODY.replace("at sunset.", "at dusk.")
+OTHER_BODY = ("Pack light layers, a rain jacket and comfortable shoes, since spring weather on the "
+              "coast changes quickly and most sights are reached on foot or by local ferry.")
+THIRD_BODY = ("Regional trains leave every hour from the central station; buy tickets at the machines "
+              "and validate them before boarding to avoid fines from the conductors.")
+
+def section(document, page, title, body):
+    return Section(document, page, title, 0, f"{title}\n{body}")
+
+@pytest.fixture
+def store():
+    return SectionStore.from_sections([
+        section("a.pdf", 1, "Walking Tour", BODY),
+        section("a.pdf", 2, "Packing", OTHER_BODY),
+        # Exact copy of the first section in another document
+        section("b.pdf", 4, "Walking Tour", BODY),
+        section("b.pdf", 5, "Trains", THIRD_BODY),
+        # Near copy: one word differs
+        section("c.pdf", 1, "Walking Tour", NEAR_BODY),
+    ])
+
+def test_duplicates_collapse_to_the_earliest_section(store):
+    assert duplicate_representatives(store, 0.5).tolist() == [0, 1, 0, 3, 0]
+
+def test_distinct_sections_are_kept(store):
+    distinct = store.subset([0, 1, 3])
+    assert duplicate_representatives(distinct, 0.5).tolist() == [0, 1, 2]
+
+def test_analyzer_ranks_only_representatives(store):
+    collapsed = PersonaDocumentAnalyzer(dedup=0.5).collapse_duplicates(store)
+    assert [(s.document, s.page_number) for s in collapsed] == [("a.pdf", 1), ("a.pdf", 2), ("b.pdf", 5)]
+
+@pytest.mark.parametrize("threshold", [-0.5, 0.0, 1.5, float("nan")])
+def test_threshold_outside_unit_interval_is_rejected(store, threshold):
+    with pytest.raises(ValueError):
+        duplicate_representatives(store, threshold)
+
+@pytest.mark.parametrize("similarity", [-0.5, 1.5, float("nan")])
+def test_analyzer_rejects_invalid_similarity(similarity):
+    with pytest.raises(ValueError):
+        PersonaDocumentAnalyzer(dedup=similarity)
@@ -0,0 +1,82 @@
+# Adobe India Hackathon - Connecting the Dots
+# Tests for the incremental-run manifest's skip and re-run decisions
+
+import os
+
+import pytest
+
+import manifest
+from manifest import CollectionManifest
+
+VERSION = "extractor=1;ranker=heuristic"
+
+@pytest.fixture
+def collection(tmp_path):
+    """A collection folder with its input JSON and two PDFs, and the output of a recorded run"""
+    folder = tmp_path / "input" / "Collection"
+    (folder / "PDFs").mkdir(parents=True)
+    metadata = folder / "challenge1b_input.json"
+    metadata.write_text('{"persona": {"role": "Planner"}}')
+    pdfs = [folder / "PDFs" / "a.pdf", folder / "PDFs" / "b.pdf"]
+    for pdf in pdfs:
+        pdf.write_bytes(b"%PDF-1.4 " + pdf.name.encode())
+    output_dir = tmp_path / "output" / "Collection"
+    output_dir.mkdir(parents=True)
+    output = output_dir / "challenge1b_input_output.json"
+    output.write_text("{}")
+
+    recorded = CollectionManifest(output_dir)
+    assert recorded.check(VERSION, metadata, pdfs, output) == ["no previous run"]
+    recorded.save()
+    return output_dir, metadata, pdfs, output
+
+def check(collection, version=VERSION, pdfs=None):
+    output_dir, metadata, recorded_pdfs, output = collection
+    return CollectionManifest(output_dir).check(version, metadata, recorded_pdfs if pdfs is None else pdfs, output)
+
+def test_unchanged_collection_is_skipped(collection):
+    assert check(collection) == []
+
+def test_unchanged_files_are_not_rehashed(collection, monkeypatch):
+    def fail(path):
+        raise AssertionError(f"{path} was re-read")
+    monkeypatch.setattr(manifest, "file_sha256", fail)
+    assert check(collection) == []
+
+def test_changed_pdf(collection):
+    collection[2][1].write_bytes(b"%PDF-1.4 edited")
+    assert check(collection) == ["b.pdf"]
+
+def test_added_pdf(collection):
+    added = collection[2][0].parent / "c.pdf"
+    added.write_bytes(b"%PDF-1.4 c")
+    assert check(collection, pdfs=collection[2] + [added]) == ["c.pdf"]
+
+def test_removed_pdf(collection):
+    os.remove(collection[2][0])
+    assert check(collection, pdfs=collection[2][1:]) == ["a.pdf (removed)"]
+
+def test_touched_but_identical_pdf_is_skipped(collection):
+    pdf = collection[2][0]
+    stat = os.stat(pdf)
+    os.utime(pdf, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    current = CollectionManifest(collection[0])
+    assert current.check(VERSION, collection[1], collection[2], collection[3]) == []
+    # The new mtime is recorded so the next run does not hash the file again
+    assert current.current["pdfs"]["a.pdf"]["mtime_ns"] == stat.st_mtime_ns + 10**9
+    assert current.current["pdfs"]["a.pdf"]["sha256"] == current.previous["pdfs"]["a.pdf"]["sha256"]
+
+def test_changed_input_json(collection):
+    collection[1].write_text('{"persona": {"role": "Chef"}}')
+    assert check(collection) == ["challenge1b_input.json"]
+
+def test_analyzer_version_change(collection):
+    assert check(collection, version=VERSION + ";dedup=0.5") == ["analyzer version"]
+
+def test_missing_output(collection):
+    os.remove(collection[3])
+    assert check(collection) == ["missing output"]
+
+def test_corrupt_manifest_counts_as_no_previous_run(collection):
+    (collection[0] / manifest.MANIFEST_NAME).write_text("{not json")
+    assert check(collection) == ["no previous run"]
@@ -0,0 +1,52 @@
+# Adobe India Hackathon - Connecting the Dots
+# Regression tests: legacy scoring reproduces the original keyword scan exactly
+
+import pytest
+
+from main import PersonaDocumentAnalyzer
+from section_store import Section
+
+PERSONA = "Travel Planner"
+JOB = "Plan a trip of 4 days for a group of 10 college friends. Plan the trip start."
+
+def original_relevance_score(section_keywords, section, persona, job):
+    """calculate_relevance_score as first shipped: substring checks over the lowercased text"""
+    content = (section.content + " " + section.section_title).lower()
+    score = 0.0
+    for keyword in persona.lower().split():
+        if keyword in content:
+            score += 2.0
+    for keyword in job.lower().split():
+        if keyword in content:
+            score += 3.0
+    for keywords in section_keywords.values():
+        for keyword in keywords:
+            if keyword in content:
+                score += 1.0
+    score += min(len(section.content) / 1000, 2.0)
+    return score
+
+SECTIONS = [
+    # "art" only occurs inside "start", "party" and "smart", which substrings match
+    Section("a.pdf", 1, "Getting Started", 0, "Getting Started\nStart the party with smart planning."),
+    # Repeated and punctuated job words ("trip", "friends.") and uppercase text
+    Section("a.pdf", 2, "Group Trips", 0, "Group Trips\nA TRIP FOR FRIENDS. Our trip data and statistics."),
+    # Section-type keywords listed twice ("summary") and a long body for the length bonus
+    Section("b.pdf", 1, "Summary", 0, "Summary\n" + "Overview of methodology and results. " * 80),
+    Section("b.pdf", 3, "Nothing", 0, "Nothing\nZzz."),
+    Section("c.pdf", 7, "", 0, ""),
+]
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return PersonaDocumentAnalyzer(legacy_scoring=True)
+
+@pytest.mark.parametrize("section", SECTIONS, ids=lambda section: section.section_title or "empty")
+def test_legacy_scores_match_original_scan(analyzer, section):
+    expected = original_relevance_score(analyzer.section_keywords, section, PERSONA, JOB)
+    assert analyzer.calculate_relevance_score(section, PERSONA, JOB) == expected
+
+def test_only_legacy_mode_matches_substrings(analyzer):
+    section = Section("a.pdf", 1, "S", 0, "S\nStart here.")
+    assert analyzer.calculate_relevance_score(section, "", "art") == 3.0 + len(section.content) / 1000
+    assert PersonaDocumentAnalyzer().calculate_relevance_score(section, "", "art") == len(section.content) / 1000
@@ -0,0 +1,69 @@
+# Adobe India Hackathon - Connecting the Dots
+# Tests for the binary section cache format and its LRU eviction
+
+import os
+
+from section_cache import SectionCache, decode_sections, encode_sections
+from section_store import SectionStore
+
+PAGES = [
+    "Overview\nPlain ASCII paragraph that is comfortably longer than fifty characters.\n\ntail",
+    "lead\n\nÜbersicht – naïve\nNon-ASCII text: 日本語, emoji 🎉 and a lone surrogate \ud800 survive.",
+    "Third Page\nAnother paragraph, long enough to be picked up as a section here.\n\n"
+    "Fourth Title\nAnd a second section on the same page, also long enough to count.",
+]
+
+def document_store(document: str = "doc.pdf") -> SectionStore:
+    store = SectionStore()
+    for page_number, text in enumerate(PAGES, start=1):
+        store.add_page(document, page_number, text)
+    return store
+
+def test_round_trip_several_pages_and_non_ascii_text():
+    store = document_store()
+    assert len(store) == 4
+    decoded = decode_sections(encode_sections(store), "doc.pdf")
+    assert list(decoded) == list(store)
+    assert decoded.texts == store.texts
+
+def test_round_trip_attaches_the_requested_document_name():
+    decoded = decode_sections(encode_sections(document_store("old name.pdf")), "new name.pdf")
+    assert {section.document for section in decoded} == {"new name.pdf"}
+
+def test_round_trip_empty_store():
+    decoded = decode_sections(encode_sections(SectionStore()), "empty.pdf")
+    assert len(decoded) == 0 and decoded.texts == []
+
+def test_round_trip_of_concatenated_and_subset_stores():
+    combined = SectionStore.concat([document_store(), document_store()])
+    assert list(decode_sections(encode_sections(combined), "doc.pdf")) == list(combined)
+    # A subset shares its parent's texts, including ones none of its sections use
+    subset = combined.subset([1, 3, 6])
+    assert list(decode_sections(encode_sections(subset), "doc.pdf")) == list(subset)
+
+def test_get_and_put_through_the_cache(tmp_path):
+    cache = SectionCache(str(tmp_path), version="test")
+    store = document_store()
+    assert cache.get("missing", "doc.pdf") is None
+    cache.put("key", store)
+    assert list(cache.get("key", "doc.pdf")) == list(store)
+
+def test_corrupt_entry_is_discarded(tmp_path):
+    cache = SectionCache(str(tmp_path))
+    (tmp_path / "bad.sec").write_bytes(b"not zlib")
+    assert cache.get("bad", "doc.pdf") is None
+    assert not (tmp_path / "bad.sec").exists()
+
+def test_evict_removes_least_recently_used_entries_past_the_cap(tmp_path):
+    entry_size = len(encode_sections(document_store()))
+    # Room for two entries but not three
+    cache = SectionCache(str(tmp_path), max_bytes=entry_size * 2 + entry_size // 2)
+    for age, key in enumerate(["a", "b"]):
+        cache.put(key, document_store())
+        # Distinct, old last-used times: a before b
+        os.utime(tmp_path / f"{key}.sec", (1000 + age, 1000 + age))
+    # Reading a makes it the most recently used, so b is evicted instead
+    assert cache.get("a", "doc.pdf") is not None
+    cache.put("c", document_store())
+    assert sorted(path.name for path in tmp_path.glob("*.sec")) == ["a.sec", "c.sec"]
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.sec")) <= cache.max_bytes
@@ -0,0 +1,58 @@
+# Adobe India Hackathon - Connecting the Dots
+# Tests for the columnar section store: offsets, trimming, subset and concat
+
+from section_store import Section, SectionStore
+
+PAGE_1 = "Header junk\n\nIntroduction\nThis opening paragraph is long enough to count as a section.\n\nfooter"
+PAGE_2 = "Café Menu\nCrème brûlée, naïve façade and 日本語 text fill this paragraph nicely.\n\nx"
+
+def sample_store() -> SectionStore:
+    store = SectionStore()
+    store.add_page("a.pdf", 1, PAGE_1)
+    store.add_page("a.pdf", 2, PAGE_2)
+    store.add_page("b.pdf", 5, PAGE_1)
+    return store
+
+def test_add_page_keeps_titles_and_contents_after_trimming():
+    store = sample_store()
+    assert list(store) == [
+        Section("a.pdf", 1, "Introduction", 0,
+                "Introduction\nThis opening paragraph is long enough to count as a section."),
+        Section("a.pdf", 2, "Café Menu", 0,
+                "Café Menu\nCrème brûlée, naïve façade and 日本語 text fill this paragraph nicely."),
+        Section("b.pdf", 5, "Introduction", 0,
+                "Introduction\nThis opening paragraph is long enough to count as a section."),
+    ]
+    # Only the part of each page that a section refers to is kept
+    assert store.texts[0] == store[0].content
+    assert store.documents == ["a.pdf", "b.pdf"]
+
+def test_add_text_with_several_sections_on_one_page():
+    text = "skip First\nbody one\nSecond\nbody two tail"
+    store = SectionStore()
+    assert store.add_text("c.pdf", 3, text, [(5, 10, 19), (20, 26, 35)]) == 2
+    assert [(section.section_title, section.content) for section in store] == [
+        ("First", "First\nbody one"), ("Second", "Second\nbody two")]
+    assert len(store.texts) == 1
+    assert store.add_text("c.pdf", 4, text, []) == 0
+    assert len(store) == 2 and len(store.texts) == 1
+
+def test_concat_remaps_documents_and_texts():
+    first, second = SectionStore(), SectionStore()
+    first.add_page("a.pdf", 1, PAGE_1)
+    second.add_page("b.pdf", 1, PAGE_2)
+    second.add_page("a.pdf", 2, PAGE_1)
+    combined = SectionStore.concat([first, SectionStore(), second])
+    assert list(combined) == list(first) + list(second)
+    assert combined.documents == ["a.pdf", "b.pdf"]
+
+def test_subset_keeps_order_and_shares_texts():
+    store = sample_store()
+    subset = store.subset([2, 0])
+    assert list(subset) == [store[2], store[0]]
+    assert subset.texts is store.texts
+    assert len(store.subset([])) == 0
+
+def test_from_sections_round_trips_materialized_sections():
+    sections = list(sample_store())
+    assert list(SectionStore.from_sections(sections)) == sections
@@ -0,0 +1,70 @@
+# Adobe India Hackathon - Connecting the Dots
+# Tests that incrementally updated term statistics match a fresh count
+
+import os
+
+import pytest
+
+from main import PersonaDocumentAnalyzer
+from term_stats import TermStatistics
+
+TEXTS = {
+    "alpha.pdf": ["Coastal Walks\nThe coastal path runs past quiet beaches and old fishing villages.",
+                  "Harbour Food\nFresh seafood stalls line the harbour every evening in summer."],
+    "beta.pdf": ["Museum Guide\nThe city museum covers local history, art and regional culture."],
+    "gamma.pdf": ["Wine Country\nVineyards in the hills offer tastings of regional wine and cheese.",
+                  "Train Travel\nRegional trains connect the coast with the hills several times a day."],
+}
+
+@pytest.fixture
+def collection(tmp_path, make_pdf):
+    folder = tmp_path / "PDFs"
+    folder.mkdir()
+    return {name: make_pdf(folder / name, pages) for name, pages in TEXTS.items()}
+
+def fresh_statistics(paths):
+    return PersonaDocumentAnalyzer().term_statistics(paths)
+
+def assert_same_counts(stats: TermStatistics, expected: TermStatistics):
+    assert stats.n_sections == expected.n_sections > 0
+    assert stats.total_length == expected.total_length
+    assert stats.df == expected.df
+    assert stats.cf == expected.cf
+    assert set(stats.documents) == set(expected.documents)
+
+def test_adding_a_pdf_matches_a_fresh_count(tmp_path, collection):
+    analyzer = PersonaDocumentAnalyzer(stats_dir=str(tmp_path / "stats"))
+    before = [collection["alpha.pdf"], collection["beta.pdf"]]
+    analyzer.term_statistics(before)
+
+    after = before + [collection["gamma.pdf"]]
+    stats, stale = analyzer.load_term_statistics(after)
+    # Only the new PDF needs counting
+    assert stale == [collection["gamma.pdf"]]
+    analyzer.update_term_statistics(stats, stale, after)
+    assert_same_counts(stats, fresh_statistics(after))
+    assert_same_counts(analyzer.term_statistics(after), fresh_statistics(after))
+
+def test_removing_a_pdf_matches_a_fresh_count(tmp_path, collection):
+    analyzer = PersonaDocumentAnalyzer(stats_dir=str(tmp_path / "stats"))
+    analyzer.term_statistics(list(collection.values()))
+
+    os.remove(collection["beta.pdf"])
+    after = [collection["alpha.pdf"], collection["gamma.pdf"]]
+    stats, stale = analyzer.load_term_statistics(after)
+    assert stale == []
+    assert "beta.pdf" not in stats.documents
+    # Terms only beta.pdf contained are dropped rather than left at zero
+    assert "museum" not in stats.df
+    assert_same_counts(stats, fresh_statistics(after))
+
+def test_changed_pdf_is_recounted(tmp_path, collection, make_pdf):
+    analyzer = PersonaDocumentAnalyzer(stats_dir=str(tmp_path / "stats"))
+    paths = list(collection.values())
+    analyzer.term_statistics(paths)
+
+    make_pdf(collection["beta.pdf"], TEXTS["gamma.pdf"])
+    stats, stale = analyzer.load_term_statistics(paths)
+    assert stale == [collection["beta.pdf"]]
+    analyzer.update_term_statistics(stats, stale, paths)
+    assert_same_counts(stats, fresh_statistics(paths))
@@ -1,42 +1,103 @@
+import argparse
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
-def validate_round_1a_output(filepath):
-    """Validate Round 1A JSON output format"""
+# Schema of each round, set up once per process and shared by every file checked
+ROUND_1A_ITEM_FIELDS = ("level", "text", "page")
+ROUND_1A_LEVELS = frozenset(("H1", "H2", "H3"))
+ROUND_1B_SECTIONS = ("metadata", "extracted_sections", "subsection_analysis")
+ROUND_1B_METADATA_FIELDS = ("input_documents", "persona", "job_to_be_done", "processing_timestamp")
+ROUND_1B_SECTION_FIELDS = ("document", "page_number", "section_title", "importance_rank")
+ROUND_1B_SUBSECTION_FIELDS = ("document", "refined_text", "page_number")
+
+# Reference output shipped in each input collection
+GOLDEN_NAME = "challenge1b_output.json"
+# Written beside outputs but not outputs themselves
+SKIPPED_NAMES = frozenset(("schedule_report.json",))
+# Rank-biased overlap persistence: rank d counts p**(d-1), so the top ranks dominate
+RBO_PERSISTENCE = 0.9
+METRICS = ("overlap_at_k", "rbo", "document_recall", "title_recall")
+
+def check_round_1a(data):
+    """Validate parsed Round 1A output"""
+    if not isinstance(data, dict):
+        return False, "Output must be a JSON object"
+
+    # Check required fields
+    if "title" not in data:
+        return False, "Missing 'title' field"
+
+    if "outline" not in data:
+        return False, "Missing 'outline' field"
+
+    if not isinstance(data["outline"], list):
+        return False, "'outline' must be a list"
+
+    # Validate each outline item
+    for i, item in enumerate(data["outline"]):
+        if not isinstance(item, dict):
+            return False, f"Outline item {i} must be a dictionary"
+
+        for field in ROUND_1A_ITEM_FIELDS:
+            if field not in item:
+                return False, f"Outline item {i} missing '{field}' field"
+
+        # Validate level values
+        if item["level"] not in ROUND_1A_LEVELS:
+            return False, f"Invalid level '{item['level']}' in item {i}"
+
+        # Validate page number
+        if not isinstance(item["page"], int) or item["page"] < 1:
+            return False, f"Invalid page number in item {i}"
+
+    return True, "Valid Round 1A output format"
+
+def check_round_1b(data):
+    """Validate parsed Round 1B output"""
+    if not isinstance(data, dict):
+        return False, "Output must be a JSON object"
+
+    # Check top-level structure
+    for section in ROUND_1B_SECTIONS:
+        if section not in data:
+            return False, f"Missing '{section}' section"
+
+    # Validate metadata
+    metadata = data["metadata"]
+    for field in ROUND_1B_METADATA_FIELDS:
+        if field not in metadata:
+            return False, f"Missing metadata field: {field}"
+
+    # Validate extracted_sections
+    sections = data["extracted_sections"]
+    if not isinstance(sections, list):
+        return False, "'extracted_sections' must be a list"
+
+    for i, section in enumerate(sections):
+        for field in ROUND_1B_SECTION_FIELDS:
+            if field not in section:
+                return False, f"Section {i} missing field: {field}"
+
+    # Validate subsection_analysis
+    subsections = data["subsection_analysis"]
+    if not isinstance(subsections, list):
+        return False, "'subsection_analysis' must be a list"
+
+    for i, subsection in enumerate(subsections):
+        for field in ROUND_1B_SUBSECTION_FIELDS:
+            if field not in subsection:
+                return False, f"Subsection {i} missing field: {field}"
+
+    return True, "Valid Round 1B output format"
+
+def _validate_file(filepath, check):
     try:
         with open(filepath, 'r') as f:
             data = json.load(f)
-        
-        # Check required fields
-        if "title" not in data:
-            return False, "Missing 'title' field"
-        
-        if "outline" not in data:
-            return False, "Missing 'outline' field"
-        
-        if not isinstance(data["outline"], list):
-            return False, "'outline' must be a list"
-        
-        # Validate each outline item
-        for i, item in enumerate(data["outline"]):
-            if not isinstance(item, dict):
-                return False, f"Outline item {i} must be a dictionary"
-            
-            required_fields = ["level", "text", "page"]
-            for field in required_fields:
-                if field not in item:
-                    return False, f"Outline item {i} missing '{field}' field"
-            
-            # Validate level values
-            if item["level"] not in ["H1", "H2", "H3"]:
-                return False, f"Invalid level '{item['level']}' in item {i}"
-            
-            # Validate page number
-            if not isinstance(item["page"], int) or item["page"] < 1:
-                return False, f"Invalid page number in item {i}"
-        
-        return True, "Valid Round 1A output format"
-        
+        return check(data)
     except json.JSONDecodeError:
         return False, "Invalid JSON format"
     except FileNotFoundError:
@@ -44,64 +105,191 @@ def validate_round_1a_output(filepath):
     except Exception as e:
         return False, f"Error: {str(e)}"
 
+def validate_round_1a_output(filepath):
+    """Validate Round 1A JSON output format"""
+    return _validate_file(filepath, check_round_1a)
+
 def validate_round_1b_output(filepath):
     """Validate Round 1B JSON output format"""
+    return _validate_file(filepath, check_round_1b)
+
+def rank_overlap(ranking, golden):
+    """Rank-overlap metrics of a ranking of extracted_sections against the golden one
+
+    Sections are identified by document and page, since titles depend on
+    how pages are segmented. k is the length of the golden ranking.
+    """
+    k = len(golden)
+    ours = [(section["document"], section["page_number"]) for section in ranking[:k]]
+    theirs = [(section["document"], section["page_number"]) for section in golden]
+    # Truncated rank-biased overlap, normalized so identical rankings score 1
+    weighted = total = 0.0
+    for depth in range(1, k + 1):
+        weight = RBO_PERSISTENCE ** (depth - 1)
+        weighted += weight * len(set(ours[:depth]) & set(theirs[:depth])) / depth
+        total += weight
+    golden_documents = {document for document, _ in theirs}
+    golden_titles = {section["section_title"] for section in golden}
+    return {
+        "overlap_at_k": len(set(ours) & set(theirs)) / k,
+        "rbo": weighted / total,
+        "document_recall": len(golden_documents & {document for document, _ in ours}) / len(golden_documents),
+        "title_recall": len(golden_titles & {section["section_title"] for section in ranking[:k]}) / len(golden_titles),
+    }
+
+def check_output_file(filepath, golden_path=None):
+    """Validate one output, detecting its round, and score it against a golden when one applies
+
+    The golden only applies when it answers the same persona and job, so
+    batch outputs for other queries are validated but not compared.
+    """
+    result = {"path": str(filepath)}
     try:
-        with open(filepath, 'r') as f:
+        with open(filepath, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        
-        # Check top-level structure
-        required_sections = ["metadata", "extracted_sections", "subsection_analysis"]
-        for section in required_sections:
-            if section not in data:
-                return False, f"Missing '{section}' section"
-        
-        # Validate metadata
-        metadata = data["metadata"]
-        metadata_fields = ["input_documents", "persona", "job_to_be_done", "processing_timestamp"]
-        for field in metadata_fields:
-            if field not in metadata:
-                return False, f"Missing metadata field: {field}"
-        
-        # Validate extracted_sections
-        sections = data["extracted_sections"]
-        if not isinstance(sections, list):
-            return False, "'extracted_sections' must be a list"
-        
-        for i, section in enumerate(sections):
-            section_fields = ["document", "page_number", "section_title", "importance_rank"]
-            for field in section_fields:
-                if field not in section:
-                    return False, f"Section {i} missing field: {field}"
-        
-        # Validate subsection_analysis
-        subsections = data["subsection_analysis"]
-        if not isinstance(subsections, list):
-            return False, "'subsection_analysis' must be a list"
-        
-        for i, subsection in enumerate(subsections):
-            subsection_fields = ["document", "refined_text", "page_number"]
-            for field in subsection_fields:
-                if field not in subsection:
-                    return False, f"Subsection {i} missing field: {field}"
-        
-        return True, "Valid Round 1B output format"
-        
     except json.JSONDecodeError:
-        return False, "Invalid JSON format"
-    except FileNotFoundError:
-        return False, "File not found"
+        result.update(round="?", valid=False, message="Invalid JSON format")
+        return result
+    except OSError as e:
+        result.update(round="?", valid=False, message=f"Error: {str(e)}")
+        return result
+
+    result["round"] = "1a" if isinstance(data, dict) and "outline" in data else "1b"
+    try:
+        if result["round"] == "1a":
+            result["valid"], result["message"] = check_round_1a(data)
+            return result
+        result["valid"], result["message"] = check_round_1b(data)
+        if not result["valid"] or golden_path is None:
+            return result
+
+        with open(golden_path, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+        if golden.get("extracted_sections") and all(
+                data["metadata"].get(field) == golden["metadata"].get(field) for field in ("persona", "job_to_be_done")):
+            result["golden"] = str(golden_path)
+            result["metrics"] = rank_overlap(data["extracted_sections"], golden["extracted_sections"])
     except Exception as e:
-        return False, f"Error: {str(e)}"
+        # Malformed values (a number for metadata, a string for a section) fail this file, not the run
+        result.pop("metrics", None)
+        result.update(valid=False, message=f"Error: {str(e)}")
+    return result
+
+def _check_task(task):
+    return check_output_file(*task)
+
+def find_outputs(output_dir, input_dir=None, exclude=()):
+    """(output file, golden or None) for every output JSON under output_dir
+
+    Hidden files and folders (manifests, caches, indexes, term statistics),
+    traces and the schedule report are skipped. An output's golden is the
+    GOLDEN_NAME file of the input collection with the same relative folder.
+    """
+    output_dir = Path(output_dir)
+    excluded = {Path(path).resolve() for path in exclude}
+    tasks = []
+    for filepath in sorted(output_dir.rglob("*.json")):
+        relative = filepath.relative_to(output_dir)
+        if (any(part.startswith(".") for part in relative.parts) or filepath.name in SKIPPED_NAMES
+                or filepath.name.endswith(".trace.json") or filepath.resolve() in excluded):
+            continue
+        golden = Path(input_dir) / relative.parent / GOLDEN_NAME if input_dir is not None else None
+        tasks.append((filepath, golden if golden is not None and golden.is_file() else None))
+    return tasks
+
+def validate_tree(output_dir, input_dir=None, workers=1, exclude=()):
+    """Validate every output under output_dir and diff rankings against goldens, as one summary report
+
+    Files are checked in a pool of worker processes, each importing the
+    schema once and taking files in chunks, rather than one interpreter per
+    file.
+    """
+    tasks = find_outputs(output_dir, input_dir, exclude)
+    if workers > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            files = list(pool.map(_check_task, tasks, chunksize=chunksize))
+    else:
+        files = [_check_task(task) for task in tasks]
+
+    compared = [result["metrics"] for result in files if "metrics" in result]
+    return {
+        "output_dir": str(output_dir),
+        "input_dir": None if input_dir is None else str(input_dir),
+        "files": len(files),
+        "valid": sum(result["valid"] for result in files),
+        "compared": len(compared),
+        "mean": {metric: sum(metrics[metric] for metrics in compared) / len(compared) for metric in METRICS}
+                if compared else {},
+        "results": files,
+    }
+
+def compare_reports(report, baseline, tolerance):
+    """Mean metrics that dropped more than tolerance below a baseline report, as printable strings"""
+    regressions = []
+    for metric, before in baseline.get("mean", {}).items():
+        current = report["mean"].get(metric)
+        if current is not None and current < before - tolerance:
+            regressions.append(f"{metric}: {current:.3f} vs baseline {before:.3f}")
+    return regressions
+
+def print_report(report):
+    for result in report["results"]:
+        if not result["valid"]:
+            print(f"❌ {result['path']}: {result['message']}")
+        elif "metrics" in result:
+            print(f"✅ {result['path']}: " + "  ".join(f"{metric} {result['metrics'][metric]:.2f}"
+                                                   for metric in METRICS))
+    print(f"\n📊 {report['valid']}/{report['files']} valid, {report['compared']} compared with goldens")
+    if report["mean"]:
+        print("   mean " + "  ".join(f"{metric} {value:.3f}" for metric, value in report["mean"].items()))
+
+def run_bulk(argv=None):
+    """Validate an output tree in parallel and diff it against the input collections' goldens"""
+    parser = argparse.ArgumentParser(prog="validate_output.py bulk",
+                                     description="Validate every output JSON under a folder in one run")
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--input-dir", type=Path, default=Path(os.path.dirname(os.path.abspath(__file__))) / "input",
+                        help=f"collections holding {GOLDEN_NAME} goldens, mirrored by the output folders")
+    parser.add_argument("--workers", type=int, default=0, help="validation processes (0 = one per CPU)")
+    parser.add_argument("--report", default="validation_report.json")
+    parser.add_argument("--baseline", help="earlier report whose mean metrics must not drop")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="allowed drop of a mean metric below the baseline")
+    args = parser.parse_args(argv)
+
+    input_dir = args.input_dir if args.input_dir.is_dir() else None
+    report = validate_tree(args.output_dir, input_dir, args.workers or os.cpu_count() or 1, exclude=[args.report])
+    print_report(report)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Report saved to {args.report}")
+
+    failed = report["valid"] < report["files"]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) below baseline {args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            failed = True
+        else:
+            print(f"\n✅ No metric below baseline {args.baseline}")
+    return 1 if failed else 0
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        sys.exit(run_bulk(sys.argv[2:]))
+
     if len(sys.argv) != 3:
         print("Usage: python validate_output.py [1a|1b] <json_file>")
+        print("       python validate_output.py bulk <output_dir> [--input-dir DIR] [--workers N] [--baseline REPORT]")
         sys.exit(1)
-    
+
     round_type = sys.argv[1]
     filepath = sys.argv[2]
-    
+
     if round_type == "1a":
         is_valid, message = validate_round_1a_output(filepath)
     elif round_type == "1b":
@@ -109,6 +297,6 @@ if __name__ == "__main__":
     else:
         print("Invalid round type. Use '1a' or '1b'")
         sys.exit(1)
-    
+
     print(f"Validation result: {message}")
-    sys.exit(0 if is_valid else 1)
\ No newline at end of file
+    sys.exit(0 if is_valid else 1)
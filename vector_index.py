@@ -0,0 +1,256 @@
+# Adobe India Hackathon - Connecting the Dots
+# Persisted feature-hashed TF-IDF index for fast section retrieval
+
+import json
+import logging
+import math
+import os
+import shutil
+import zlib
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from scoring import tokenize
+from section_store import Section, SectionStore
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 1
+DEFAULT_DIM = 1024
+# Below this many sections one product over every row is already fast, so
+# partitioning is skipped even when asked for
+CLUSTER_MIN_ROWS = 4096
+# Centroids are trained on a sample, then every row is assigned once
+KMEANS_SAMPLE = 8192
+KMEANS_ITERATIONS = 8
+CHUNK_ROWS = 4096
+
+_COLUMNS = ("document_ids", "page_numbers", "text_ids", "starts", "title_ends", "ends")
+
+def hash_bucket(token: str, dim: int) -> int:
+    """Stable bucket for a token; Python's hash() is salted per process"""
+    return zlib.crc32(token.encode("utf-8", "surrogatepass")) % dim
+
+def _normalize_rows(matrix: np.ndarray):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+def _kmeans(sample: np.ndarray, clusters: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids of unit-length rows"""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        # Empty clusters keep their previous centroid
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        _normalize_rows(sums)
+        centroids = sums
+    return centroids
+
+class VectorIndex:
+    """Sections of one collection as unit-length hashed TF-IDF vectors
+
+    Each section's tokens are hashed into a fixed number of buckets, so no
+    vocabulary or model is needed. Search is exact by default. Large indexes
+    can instead be partitioned by k-means, with rows stored cluster by
+    cluster, so a query scans only the clusters whose centroids are closest
+    to it; that search is approximate and may miss a best match lying in an
+    unscanned cluster. On disk, the vectors and section texts are
+    memory-mapped and only the rows a query touches are read.
+    """
+
+    def __init__(self, vectors: np.ndarray, idf: np.ndarray, columns: Dict[str, np.ndarray],
+                 documents: List[str], texts: np.ndarray, text_offsets: np.ndarray,
+                 centroids: Optional[np.ndarray] = None, cluster_offsets: Optional[np.ndarray] = None):
+        self.vectors = vectors
+        self.idf = idf
+        self.dim = vectors.shape[1]
+        # Section fields in row order, plus each row's position in extraction order
+        self.columns = columns
+        self.documents = documents
+        self.texts = texts
+        self.text_offsets = text_offsets
+        self.centroids = centroids
+        self.cluster_offsets = cluster_offsets
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, store: SectionStore, dim: int = DEFAULT_DIM, directory: Optional[str] = None,
+              fingerprint: Optional[Dict] = None, partition: bool = False) -> "VectorIndex":
+        """Index every section of a store, persisting it to directory when one is given
+
+        partition trades exact search for speed on indexes of CLUSTER_MIN_ROWS
+        sections or more.
+        """
+        n = len(store)
+        tmp_dir = None
+        if directory is not None and n:
+            tmp_dir = directory.rstrip(os.sep) + ".tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            raw = np.lib.format.open_memmap(os.path.join(tmp_dir, "raw.npy"), mode="w+",
+                                            dtype=np.float32, shape=(n, dim))
+        else:
+            raw = np.zeros((n, dim), dtype=np.float32)
+
+        # Pass 1: sublinear term frequencies per bucket
+        buckets = {}
+        for row, section in enumerate(store):
+            counts = {}
+            for token in tokenize(section.content + " " + section.section_title):
+                bucket = buckets.get(token)
+                if bucket is None:
+                    bucket = buckets[token] = hash_bucket(token, dim)
+                counts[bucket] = counts.get(bucket, 0) + 1
+            if counts:
+                raw[row, list(counts)] = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32))
+
+        # Pass 2: weight by inverse document frequency and normalize, a chunk at a time
+        df = np.zeros(dim, dtype=np.int64)
+        for start in range(0, n, CHUNK_ROWS):
+            df += np.count_nonzero(raw[start:start + CHUNK_ROWS], axis=0)
+        idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+        for start in range(0, n, CHUNK_ROWS):
+            chunk = raw[start:start + CHUNK_ROWS] * idf
+            _normalize_rows(chunk)
+            raw[start:start + CHUNK_ROWS] = chunk
+
+        # Partition large indexes when asked and store rows cluster by cluster
+        centroids = cluster_offsets = None
+        order = np.arange(n)
+        if partition and n >= CLUSTER_MIN_ROWS:
+            clusters = min(int(math.sqrt(n)), 1024)
+            rng = np.random.default_rng(0)
+            sample = np.asarray(raw[np.sort(rng.choice(n, min(n, KMEANS_SAMPLE), replace=False))])
+            centroids = _kmeans(sample, clusters)
+            assignment = np.concatenate([np.argmax(raw[start:start + CHUNK_ROWS] @ centroids.T, axis=1)
+                                         for start in range(0, n, CHUNK_ROWS)])
+            order = np.argsort(assignment, kind="stable")
+            cluster_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=clusters))])
+
+        columns = {name: np.asarray(getattr(store, name), dtype=np.uint32)[order] for name in _COLUMNS}
+        columns["order"] = order.astype(np.uint32)
+        encoded = [text.encode("utf-8", "surrogatepass") for text in store.texts]
+        text_offsets = np.concatenate([[0], np.cumsum([len(text) for text in encoded])]).astype(np.int64)
+        texts = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        if tmp_dir is None:
+            vectors = raw[order] if centroids is not None else raw
+            return cls(vectors, idf, columns, list(store.documents), texts, text_offsets,
+                       centroids, cluster_offsets)
+
+        vectors = np.lib.format.open_memmap(os.path.join(tmp_dir, "vectors.npy"), mode="w+",
+                                            dtype=np.float32, shape=(n, dim))
+        for start in range(0, n, CHUNK_ROWS):
+            vectors[start:start + CHUNK_ROWS] = raw[order[start:start + CHUNK_ROWS]]
+        vectors.flush()
+        del raw, vectors
+        os.remove(os.path.join(tmp_dir, "raw.npy"))
+
+        np.save(os.path.join(tmp_dir, "idf.npy"), idf)
+        np.savez(os.path.join(tmp_dir, "sections.npz"), text_offsets=text_offsets, **columns)
+        texts.tofile(os.path.join(tmp_dir, "texts.bin"))
+        if centroids is not None:
+            np.save(os.path.join(tmp_dir, "centroids.npy"), centroids)
+            np.save(os.path.join(tmp_dir, "cluster_offsets.npy"), cluster_offsets)
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"format": INDEX_FORMAT, "dim": dim, "rows": n, "documents": list(store.documents),
+                       "fingerprint": fingerprint}, f)
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+        logger.info(f"Indexed {n} sections into {directory}")
+        return cls.load(directory, fingerprint)
+
+    @classmethod
+    def load(cls, directory: str, fingerprint: Optional[Dict] = None) -> Optional["VectorIndex"]:
+        """Open a persisted index, or None if it is missing or was built from other inputs"""
+        try:
+            with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta.get("format") != INDEX_FORMAT or meta.get("fingerprint") != fingerprint:
+            return None
+
+        with np.load(os.path.join(directory, "sections.npz")) as sections:
+            columns = {name: sections[name] for name in _COLUMNS + ("order",)}
+            text_offsets = sections["text_offsets"]
+        texts_path = os.path.join(directory, "texts.bin")
+        texts = (np.memmap(texts_path, dtype=np.uint8, mode="r") if os.path.getsize(texts_path)
+                 else np.zeros(0, dtype=np.uint8))
+        centroids = cluster_offsets = None
+        if os.path.exists(os.path.join(directory, "centroids.npy")):
+            centroids = np.load(os.path.join(directory, "centroids.npy"))
+            cluster_offsets = np.load(os.path.join(directory, "cluster_offsets.npy"))
+        return cls(np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r"),
+                   np.load(os.path.join(directory, "idf.npy")), columns, meta["documents"],
+                   texts, text_offsets, centroids, cluster_offsets)
+
+    def query_vector(self, query_weights: Dict[str, float]) -> np.ndarray:
+        """Unit-length hashed vector of weighted query terms"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for term, weight in query_weights.items():
+            vector[hash_bucket(term, self.dim)] += weight
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def search(self, query_weights: Dict[str, float], k: int,
+               probe: Optional[int] = None) -> List[Tuple[float, int]]:
+        """(cosine score, row) of the k best sections, best first
+
+        Partitioned indexes scan the probe closest clusters (by default a tenth
+        of them, at least 8), widening until at least k rows were seen. Ties
+        keep extraction order.
+        """
+        if not len(self) or k <= 0:
+            return []
+        query = self.query_vector(query_weights)
+
+        if self.centroids is None:
+            rows = np.arange(len(self))
+            scores = self.vectors @ query
+        else:
+            clusters = len(self.centroids)
+            probe = probe or max(8, clusters // 10)
+            ranked = np.argsort(-(self.centroids @ query), kind="stable")
+            spans, seen = [], 0
+            for cluster in ranked:
+                start, end = self.cluster_offsets[cluster], self.cluster_offsets[cluster + 1]
+                if end > start:
+                    spans.append((start, end))
+                    seen += end - start
+                if len(spans) >= probe and seen >= k:
+                    break
+            rows = np.concatenate([np.arange(start, end) for start, end in spans])
+            scores = np.concatenate([self.vectors[start:end] @ query for start, end in spans])
+
+        if len(rows) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            # Include every row tied with the k-th score so tie-breaking stays exact
+            keep = np.flatnonzero(scores >= scores[keep].min())
+            rows, scores = rows[keep], scores[keep]
+        best = np.lexsort((self.columns["order"][rows], -scores))[:k]
+        return [(float(scores[i]), int(rows[i])) for i in best]
+
+    def section(self, row: int) -> Section:
+        """Materialize one indexed section"""
+        text_id = self.columns["text_ids"][row]
+        text = bytes(self.texts[self.text_offsets[text_id]:self.text_offsets[text_id + 1]]).decode(
+            "utf-8", "surrogatepass")
+        start = self.columns["starts"][row]
+        return Section(
+            document=self.documents[self.columns["document_ids"][row]],
+            page_number=int(self.columns["page_numbers"][row]),
+            section_title=text[start:self.columns["title_ends"][row]],
+            importance_rank=0,
+            content=text[start:self.columns["ends"][row]]
+        )